@@ -0,0 +1,75 @@
+"""Analytics stage (per-90 rates, Pos/Comp percentiles, z-scores, neighbour index) vs pandas groupby.
+
+The reference computes the same percentiles with groupby().rank(pct=True) and the z-scores with
+groupby().transform, and the results are checked to match before timing is reported.
+
+Usage:
+    python benchmarks/bench_analytics.py --rows 2800 28000 --stats 200 --output analytics.json
+"""
+import argparse
+import json
+
+from common import COMPS, POSITIONS, measure
+
+import numpy as np
+import pandas as pd
+import stats_merger
+
+
+def synthetic_merged(n_rows, n_stats, seed=0):
+    """A merged-season-like frame: identity columns, 90s and n_stats integer count stats."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'PlSqu': [f'Player {i}Squad' for i in range(n_rows)], 'Player': [f'Player {i}' for i in range(n_rows)],
+        'Squad': 'Squad', 'Comp': rng.choice(COMPS, n_rows), 'Pos': rng.choice(POSITIONS, n_rows),
+        '90s': rng.integers(0, 380, n_rows) / 10,
+    })
+    stats = rng.poisson(5, (n_rows, n_stats)).astype('float32')
+    stats[rng.random(stats.shape) < 0.05] = np.nan
+    return pd.concat([df, pd.DataFrame(stats, columns=[f'stat_{k}' for k in range(n_stats)])], axis=1)
+
+
+def pandas_reference(df):
+    """Percentiles and z-scores of the per-90 rates with groupby, as a pandas user would write them."""
+    stats = [col for col in df.columns if col.startswith('stat_')]
+    nineties = df['90s'].where(df['90s'] > 0)
+    per90 = df[stats].div(nineties, axis=0).add_suffix('_per90')
+    eligible = df['90s'] >= stats_merger._ANALYTICS_MIN_90S
+    keys = [df['Pos'].str.split(',').str[0][eligible], df['Comp'][eligible]]
+    grouped = per90[eligible].groupby(keys)
+    pct = grouped.rank(pct=True) * 100
+    z = grouped.transform(lambda s: (s - s.mean()) / s.std(ddof=0))
+    return pct.reindex(df.index), z.reindex(df.index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[2800, 28000])
+    parser.add_argument('--stats', type=int, default=200)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        df = synthetic_merged(n_rows, args.stats)
+        analytics, vectorized_s, vectorized_peak = measure(stats_merger.compute_analytics, df, repeat=3)
+        (pct, z), pandas_s, pandas_peak = measure(pandas_reference, df, repeat=1)
+        _, neighbors_s, _ = measure(stats_merger._build_neighbor_index, analytics, repeat=1)
+
+        names = [f'stat_{k}_per90' for k in range(args.stats)]
+        np.testing.assert_allclose(analytics[[f'{name}_pct' for name in names]].to_numpy(), pct[names].to_numpy(), rtol=1e-4)
+        np.testing.assert_allclose(analytics[[f'{name}_z' for name in names]].to_numpy(), z[names].to_numpy(), rtol=1e-3, atol=1e-4)
+
+        result = {'rows': n_rows, 'stats': args.stats, 'vectorized_s': vectorized_s, 'pandas_s': pandas_s,
+                  'neighbors_s': neighbors_s, 'vectorized_peak_bytes': vectorized_peak, 'pandas_peak_bytes': pandas_peak}
+        results.append(result)
+        print(f"rows={n_rows:<7} vectorized={vectorized_s:.3f}s pandas groupby={pandas_s:.3f}s "
+              f"(x{pandas_s / vectorized_s:.1f}) neighbour index={neighbors_s:.3f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Disk size and reload time of the merged output as CSV vs Parquet/Feather.
+
+Usage:
+    python benchmarks/bench_export.py --rows 2800 28000 --output export.json
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from common import measure, synthetic_rows
+
+import numpy as np
+import pandas as pd
+import stats_merger
+
+
+def make_merged_frame(n_rows, n_numeric=180, seed=0):
+    """A frame shaped like the merged season table: identity columns plus many numeric stats."""
+    rows = synthetic_rows(n_rows, seed)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Player': [r[1] for r in rows], 'Nation': [r[2] for r in rows], 'Pos': [r[3] for r in rows],
+        'Squad': [r[4] for r in rows], 'Comp': [r[5].split(' ', 1)[1] for r in rows], 'Age': [r[6] for r in rows],
+    })
+    stats = {f'stat_{i}': np.round(rng.gamma(2.0, 5.0, n_rows), 1 if i % 2 else 0) for i in range(n_numeric)}
+    return pd.concat([df, pd.DataFrame(stats)], axis=1)
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[2800, 28000])
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_merger._DATA_DIR = tmp
+        for n_rows in args.rows:
+            df = make_merged_frame(n_rows)
+            base_name = f'bench_{n_rows}'
+            csv_path = os.path.join(tmp, f'{base_name}_2023-2024.csv')
+            df.to_csv(csv_path, encoding='utf-8', index=False)
+            _, csv_s, _ = measure(pd.read_csv, csv_path)
+            result = {'rows': n_rows, 'csv_bytes': os.path.getsize(csv_path), 'csv_read_s': csv_s}
+            for fmt in ('parquet', 'feather'):
+                stats_merger._export_partitioned(df, base_name, '2023-2024', fmt)
+                _, read_s, _ = measure(stats_merger.read_merged_data, base_name, fmt=fmt)
+                _, projected_s, _ = measure(stats_merger.read_merged_data, base_name, columns=['Player', 'stat_0'], fmt=fmt)
+                result[f'{fmt}_bytes'] = dir_size(os.path.join(tmp, fmt, base_name))
+                result[f'{fmt}_read_s'] = read_s
+                result[f'{fmt}_projected_read_s'] = projected_s
+            results.append(result)
+            print(f"rows={n_rows:<7} csv={result['csv_bytes'] / 1e6:.1f}MB/{csv_s:.3f}s")
+            for fmt in ('parquet', 'feather'):
+                print(f"  {fmt:<8} {result[f'{fmt}_bytes'] / 1e6:.1f}MB/{result[f'{fmt}_read_s']:.3f}s "
+                      f"(2 cols {result[f'{fmt}_projected_read_s']:.3f}s) "
+                      f"vs csv: x{result['csv_bytes'] / result[f'{fmt}_bytes']:.1f} smaller, "
+                      f"x{csv_s / result[f'{fmt}_read_s']:.1f} faster, x{csv_s / result[f'{fmt}_projected_read_s']:.1f} projected")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
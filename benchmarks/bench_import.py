@@ -0,0 +1,82 @@
+"""Cold-start time of stats_merger: package import, CLI commands and a query against exported data.
+
+Every case runs in a fresh interpreter (best of --repeat) and reports which heavy
+dependencies it ended up importing. `python -X importtime -m stats_merger --help`
+breaks a slow case down by module.
+
+Usage:
+    python benchmarks/bench_import.py --repeat 10 --output import.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import common # noqa: F401 -- puts the checkout on sys.path
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'numpy', 'requests', 'unidecode', 'lxml.etree', 'pyarrow']
+REPORT = f"import json, sys; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+# Runs the CLI like `python -m stats_merger ...` but keeps the interpreter alive for REPORT (--help exits)
+RUN_CLI = "import runpy, sys\nsys.argv = ['stats_merger', {args}]\ntry:\n    runpy.run_module('stats_merger', run_name='__main__')\nexcept SystemExit:\n    pass\n"
+
+
+def cases(work):
+    """(name, argv) of the measured commands; each prints the heavy modules it loaded as its last line."""
+    query = (f"import stats_merger; stats_merger._DATA_DIR = {os.path.join(work, 'data')!r}; "
+             "stats_merger.read_merged_data(seasons=['2023-2024'], columns=['Player'])")
+    return [
+        ('python (no import)', ['-c', REPORT]),
+        ('import stats_merger', ['-c', f'import stats_merger; {REPORT}']),
+        ('import pipeline', ['-c', f'import stats_merger.pipeline; {REPORT}']),
+        ('--help', ['-c', RUN_CLI.format(args="'--help'") + REPORT]),
+        ('--cache-info', ['-c', RUN_CLI.format(args="'--cache-info'") + REPORT]),
+        ('query exported data', ['-c', f'{query}; {REPORT}']),
+    ]
+
+
+def write_exported_season(work):
+    """A small Parquet export for the query case; False if it could not be written (no pyarrow)."""
+    import pandas as pd
+    import stats_merger
+    stats_merger._DATA_DIR = os.path.join(work, 'data')
+    df = pd.DataFrame({'PlSqu': ['a', 'b'], 'Player': ['A', 'B'], 'Comp': ['Premier League', 'La Liga'], 'Gls': [1, 2]})
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats_merger.pipeline._export_merged_data(df, 'final_fbref_all5_merged_data', '2023-2024', formats=['parquet'])
+    return os.path.isdir(os.path.join(stats_merger._DATA_DIR, 'parquet'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')]))}
+    with tempfile.TemporaryDirectory() as work:
+        has_export = write_exported_season(work)
+        for name, argv in cases(work):
+            if name == 'query exported data' and not has_export:
+                continue
+            best = float('inf')
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                output = subprocess.run([sys.executable, *argv], cwd=work, env=env, check=True, capture_output=True, text=True).stdout
+                best = min(best, time.perf_counter() - started)
+            loaded = json.loads(output.strip().splitlines()[-1])
+            results.append({'case': name, 'seconds': best, 'heavy_modules': loaded})
+            print(f"{name:<22} {best * 1000:7.1f}ms  heavy modules: {', '.join(loaded) or '-'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Micro-benchmarks for the vectorized normalization stage against the old per-row .apply code.
+
+Each stage is checked for identical output before it is timed. Scale 1 is roughly one
+Big5 season (~2,800 player rows); the maestro stage uses ~30,000 names per scale unit.
+
+Usage:
+    python benchmarks/bench_normalization.py --scales 1 10 100 --output normalization.json
+"""
+import argparse
+import json
+
+from common import measure, synthetic_rows
+
+import pandas as pd
+from unidecode import unidecode
+import stats_merger
+
+SEASON_ROWS = 2800
+MAESTRO_ROWS = 30000
+
+
+# --- Previous row-by-row implementations, kept as the reference output ---
+def legacy_transliterate(series):
+    return series.apply(lambda x: unidecode(str(x)) if pd.notnull(x) else x)
+
+
+def legacy_edad_a_decimal(edad_str):
+    if pd.isnull(edad_str): return None
+    try:
+        partes = str(edad_str).split('-')
+        años = int(partes[0])
+        dias = int(partes[1]) if len(partes) > 1 else 0
+        return round(años + dias / 365, 2)
+    except (ValueError, TypeError, IndexError):
+        try: return int(edad_str)
+        except: return None
+
+
+def legacy_player_code(nombre_fbref):
+    if pd.notnull(nombre_fbref) and str(nombre_fbref).strip():
+        s = str(nombre_fbref).lower().strip().replace("'", "")
+        return unidecode(s.replace(' ', '-'))
+    return None
+
+
+def make_frame(n_rows):
+    """Player/Squad/Age columns with the repetition pattern of real FBRef tables."""
+    rows = synthetic_rows(n_rows)
+    df = pd.DataFrame({'Player': [r[1] for r in rows], 'Squad': [r[4] for r in rows], 'Age': [r[6] for r in rows]})
+    # Real names repeat across squads and stat tables; the index suffix makes them unique
+    df['Player'] = df['Player'].str.rsplit(' ', n=1).str[0]
+    df.loc[::50, 'Age'] = None
+    df.loc[::97, 'Player'] = None
+    return df
+
+
+def assert_same(expected, actual, stage):
+    expected = pd.Series(expected).reset_index(drop=True)
+    actual = pd.Series(actual).reset_index(drop=True)
+    if not expected.isna().equals(actual.isna()):
+        raise AssertionError(f"{stage}: missing values differ")
+    mask = expected.notna()
+    if not (expected[mask].astype(str) == actual[mask].astype(str)).all():
+        raise AssertionError(f"{stage}: values differ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        season = make_frame(SEASON_ROWS * scale)
+        maestro = make_frame(MAESTRO_ROWS * scale)
+        stages = [
+            ('transliterate', season['Player'], legacy_transliterate, stats_merger._transliterar),
+            ('decimal_age', season['Age'], lambda s: s.apply(legacy_edad_a_decimal), stats_merger._edades_a_decimal),
+            ('player_code', season['Player'], lambda s: s.apply(legacy_player_code), stats_merger._generar_player_codes),
+            ('maestro_player_code', maestro['Player'], lambda s: s.apply(legacy_player_code), stats_merger._generar_player_codes),
+        ]
+        for stage, series, legacy, vectorized in stages:
+            stats_merger._unidecode_cached.cache_clear() # Every run starts cold
+            expected, legacy_s, _ = measure(legacy, series, repeat=1)
+            actual, vectorized_s, _ = measure(vectorized, series, repeat=1)
+            assert_same(expected, actual, stage)
+            results.append({'stage': stage, 'scale': scale, 'rows': len(series),
+                            'legacy_s': legacy_s, 'vectorized_s': vectorized_s, 'speedup': legacy_s / vectorized_s})
+            print(f"{stage:<20} x{scale:<4} rows={len(series):<8} legacy={legacy_s:.3f}s "
+                  f"vectorized={vectorized_s:.3f}s speedup=x{legacy_s / vectorized_s:.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""End-to-end timing of every pipeline stage against a local FBRef stand-in.
+
+Synthetic pages for all registered stat tables and a synthetic players.csv are written
+as fixtures and served through stats_merger.replay_fixtures, so the fetch stage goes
+through the real HTTP client without touching the network. Scale 1 is roughly one Big5
+season (~2,800 player rows). Pass --fixtures to time a recorded season instead
+(see `python -m stats_merger --record-fixtures DIR`).
+
+With --baseline, stages slower than the baseline by more than --max-slowdown make the
+script exit with status 1, so CI can flag regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py --scales 1 10 100 --output pipeline.json
+    python benchmarks/bench_pipeline.py --scales 1 --baseline pipeline.json --max-slowdown 1.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import synthetic_maestro_csv, synthetic_stat_page
+
+import pandas as pd
+import stats_merger
+
+SEASON_ROWS = 2800
+SEASON = '2023-2024'
+MIN_COMPARED_SECONDS = 0.05 # Stages faster than this are too noisy to flag
+
+
+def write_synthetic_fixtures(fixtures_dir, n_rows, season=SEASON, seed=0):
+    """Writes one page per StatTable plus players.csv in the layout replay_fixtures serves."""
+    for spec in stats_merger.STAT_TABLES.values():
+        stats_merger._write_atomic(stats_merger._fixture_path(fixtures_dir, spec.url(season)), synthetic_stat_page(spec, n_rows, seed=seed))
+    stats_merger._write_atomic(stats_merger._fixture_path(fixtures_dir, stats_merger._MAESTRO_URL), synthetic_maestro_csv(n_rows))
+
+
+def run_stage(results, stage, scale, func, trace_memory=False):
+    """Runs func once with the pipeline's prints silenced and records its wall time (and peak memory)."""
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = func()
+    seconds = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    if isinstance(value, list) and value and isinstance(value[0], bytes):
+        rows = None # Fetched pages: sizes, not rows
+    elif isinstance(value, list):
+        rows = sum(len(v) for v in value)
+    else:
+        rows = len(value) if hasattr(value, '__len__') else None
+    results.append({'stage': stage, 'scale': scale, 'rows': rows, 'seconds': seconds, 'peak_bytes': peak})
+    print(f"{stage:<18} x{scale:<4} rows={rows if rows is not None else '-':<8} {seconds:.3f}s")
+    return value
+
+
+def bench_scale(fixtures_dir, scale, formats, trace_memory):
+    """Times fetch, parse, rename, merge, maestro join, numeric conversion and export for one fixture set."""
+    results = []
+    specs = list(stats_merger.STAT_TABLES.values())
+    with tempfile.TemporaryDirectory() as work, stats_merger.replay_fixtures(fixtures_dir):
+        stats_merger._DATA_DIR = os.path.join(work, 'data')
+        stats_merger._MAESTRO_DB = os.path.join(work, 'players.sqlite')
+        stage = lambda name, func: run_stage(results, name, scale, func, trace_memory)
+
+        pages = stage('fetch', lambda: [stats_merger._cached_get(spec.url(SEASON)) for spec in specs])
+        raw = stage('parse', lambda: [stats_merger._extract_fbref_table(page, spec.table_id) for page, spec in zip(pages, specs)])
+        cleaned = stage('rename', lambda: [stats_merger._clean_fbref_table(df, spec) for df, spec in zip(raw, specs)])
+        merged = stage('merge', lambda: stats_merger._clean_merged_columns(stats_merger._multiway_inner_join(cleaned)[0]))
+        stage('maestro_refresh', stats_merger._refresh_maestro_store)
+        joined = stage('maestro_join', lambda: stats_merger._join_maestro(merged))
+        final = stage('numeric', lambda: stats_merger._convert_remaining_numeric(joined))
+        stage('export', lambda: stats_merger._export_merged_data(final, 'bench_pipeline', SEASON, formats) or final)
+    return results
+
+
+def compare(results, baseline_path, max_slowdown):
+    """Returns the stages that got slower than the baseline by more than max_slowdown."""
+    with open(baseline_path, encoding='utf-8') as fh:
+        baseline = {(r['stage'], r['scale']): r['seconds'] for r in json.load(fh)['results']}
+    regressions = []
+    for r in results:
+        before = baseline.get((r['stage'], r['scale']))
+        if before is None or max(before, r['seconds']) < MIN_COMPARED_SECONDS:
+            continue
+        if r['seconds'] > before * max_slowdown:
+            regressions.append({**r, 'baseline_seconds': before, 'slowdown': r['seconds'] / before})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--fixtures', help="Recorded fixtures to time instead of synthetic ones (scale is reported as 1).")
+    parser.add_argument('--formats', nargs='+', default=['csv'], choices=sorted(stats_merger._EXPORTERS))
+    parser.add_argument('--trace-memory', action='store_true', help="Also record the tracemalloc peak of every stage (slower).")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', help="Previous --output file to compare against.")
+    parser.add_argument('--max-slowdown', type=float, default=1.5)
+    args = parser.parse_args()
+
+    stats_merger._HTTP_CACHE_ENABLED = False # Every run fetches from the stand-in server
+    results = []
+    if args.fixtures:
+        results += bench_scale(args.fixtures, 1, args.formats, args.trace_memory)
+    else:
+        for scale in args.scales:
+            with tempfile.TemporaryDirectory() as fixtures_dir:
+                write_synthetic_fixtures(fixtures_dir, SEASON_ROWS * scale)
+                results += bench_scale(fixtures_dir, scale, args.formats, args.trace_memory)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+        'pandas': pd.__version__, 'fixtures': args.fixtures or 'synthetic', 'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_slowdown)
+        for r in regressions:
+            print(f"REGRESSION {r['stage']} x{r['scale']}: {r['baseline_seconds']:.3f}s -> {r['seconds']:.3f}s (x{r['slowdown']:.2f})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Latency of the service API against a local FBRef stand-in (synthetic fixtures + replay_fixtures).
+
+Measures many concurrent requests for the same stat table (requests that overlap share
+one upstream fetch), a cold season job and filtered player queries served from memory.
+
+Usage:
+    python benchmarks/bench_service.py --scale 1 --queries 200 --output service.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_pipeline import SEASON, SEASON_ROWS, write_synthetic_fixtures
+
+import stats_merger
+
+QUERIES = [
+    'squad=Arsenal', 'comp=La%20Liga&pos=FW', 'pos=DF,MF&columns=Player,Squad,Pos', 'player=mbappe',
+    'squad=Inter,Milan&pos=GK&limit=5',
+]
+
+
+def get_json(url, method='GET'):
+    with urllib.request.urlopen(urllib.request.Request(url, method=method)) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--concurrent', type=int, default=16, help="Simultaneous requests for the same stat table.")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    stats_merger._HTTP_CACHE_ENABLED = False # Dedupe must come from the service, not the disk cache
+    with tempfile.TemporaryDirectory() as work:
+        fixtures_dir = os.path.join(work, 'fixtures')
+        write_synthetic_fixtures(fixtures_dir, SEASON_ROWS * args.scale)
+        stats_merger._DATA_DIR = os.path.join(work, 'data')
+        stats_merger._MAESTRO_DB = os.path.join(work, 'players.sqlite')
+        with stats_merger.replay_fixtures(fixtures_dir):
+            server = stats_merger.start_service(port=0, export=False)
+            base = f'http://127.0.0.1:{server.server_port}'
+            try:
+                result = {'rows_per_season': SEASON_ROWS * args.scale}
+                stats_merger.get_fetch_stats(reset=True)
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrent) as pool:
+                    list(pool.map(lambda _: get_json(f'{base}/seasons/{SEASON}/stats/shooting'), range(args.concurrent)))
+                result['concurrent_stat_s'] = time.perf_counter() - started
+                result['concurrent_stat_upstream_requests'] = int(stats_merger.get_fetch_stats(reset=True)['requests'].sum())
+
+                started = time.perf_counter()
+                job = get_json(f'{base}/jobs?season={SEASON}', method='POST')
+                duplicate = get_json(f'{base}/jobs?season={SEASON}', method='POST')
+                while job['status'] in ('queued', 'running'):
+                    time.sleep(0.05)
+                    job = get_json(f"{base}/jobs/{job['id']}")
+                result['job_s'] = time.perf_counter() - started
+                result['job_status'] = job['status']
+                result['duplicate_job_shared'] = duplicate['id'] == job['id']
+
+                latencies = []
+                for i in range(args.queries):
+                    started = time.perf_counter()
+                    get_json(f'{base}/seasons/{SEASON}/players?{QUERIES[i % len(QUERIES)]}')
+                    latencies.append(time.perf_counter() - started)
+                latencies.sort()
+                result['query_p50_s'] = latencies[len(latencies) // 2]
+                result['query_p95_s'] = latencies[int(len(latencies) * 0.95) - 1]
+            finally:
+                server.shutdown()
+                server.server_close()
+                server.service.close()
+
+    print(f"job={result['job_s']:.2f}s ({result['job_status']}, duplicate shared: {result['duplicate_job_shared']}) "
+          f"concurrent stat x{args.concurrent}={result['concurrent_stat_s']:.2f}s "
+          f"upstream requests={result['concurrent_stat_upstream_requests']} "
+          f"query p50={result['query_p50_s'] * 1000:.1f}ms p95={result['query_p95_s'] * 1000:.1f}ms")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
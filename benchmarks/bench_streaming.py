@@ -0,0 +1,83 @@
+"""Peak memory of the in-memory backfill vs the streaming (partitioned) merge as seasons are added.
+
+Every measurement runs in a fresh process against synthetic fixtures served by
+stats_merger.replay_fixtures, and reports the peak RSS of that process and its children
+(the backfill merges in a process pool). The streaming peak should stay flat.
+
+Usage:
+    python benchmarks/bench_streaming.py --seasons 1 4 8 --scale 2 --output streaming.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_pipeline import SEASON_ROWS, write_synthetic_fixtures
+
+import stats_merger
+
+FIRST_YEAR = 2015
+
+
+def child(mode, fixtures_dir, n_seasons, partition_by, partitions):
+    """Runs one build in this process and prints its peak RSS as JSON."""
+    years = list(range(FIRST_YEAR, FIRST_YEAR + n_seasons))
+    with tempfile.TemporaryDirectory() as work, stats_merger.replay_fixtures(fixtures_dir):
+        stats_merger._HTTP_CACHE_ENABLED = False
+        stats_merger._DATA_DIR = os.path.join(work, 'data')
+        stats_merger._MAESTRO_DB = os.path.join(work, 'players.sqlite')
+        stats_merger._STREAM_SPILL_DIR = os.path.join(work, 'stream')
+        manifest_path = os.path.join(work, 'manifest.json')
+        started = time.perf_counter()
+        sys.stdout = open(os.devnull, 'w') # The pipeline prints progress for every table and partition
+        if mode == 'streaming':
+            stats_merger.stream_merge(years, partition_by=partition_by, partitions=partitions, manifest_path=manifest_path)
+        else:
+            stats_merger.backfill(years, manifest_path=manifest_path, merge_workers=1)
+        seconds = time.perf_counter() - started
+        sys.stdout = sys.__stdout__
+    peak_kib = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({'peak_rss_bytes': peak_kib * 1024, 'seconds': seconds}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seasons', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--scale', type=int, default=1, help="Rows per season as a multiple of a Big5 season.")
+    parser.add_argument('--partition-by', default='hash', choices=stats_merger._STREAM_PARTITION_MODES)
+    parser.add_argument('--partitions', type=int, default=stats_merger._STREAM_PARTITIONS)
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'FIXTURES', 'SEASONS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, fixtures_dir, n_seasons = args.child
+        child(mode, fixtures_dir, int(n_seasons), args.partition_by, args.partitions)
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as fixtures_dir:
+        for offset in range(max(args.seasons)):
+            write_synthetic_fixtures(fixtures_dir, SEASON_ROWS * args.scale, season=f'{FIRST_YEAR + offset}-{FIRST_YEAR + offset + 1}', seed=offset)
+        for n_seasons in args.seasons:
+            for mode in ('backfill', 'streaming'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, fixtures_dir, str(n_seasons),
+                     '--partition-by', args.partition_by, '--partitions', str(args.partitions)],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                result = {'mode': mode, 'seasons': n_seasons, 'rows_per_season': SEASON_ROWS * args.scale, **json.loads(output.splitlines()[-1])}
+                results.append(result)
+                print(f"{mode:<10} seasons={n_seasons:<3} peak_rss={result['peak_rss_bytes'] / 1e6:.0f}MB {result['seconds']:.1f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Compares _extract_fbref_table against the full-page pd.read_html path.
+
+Usage:
+    python benchmarks/bench_table_extraction.py                       # synthetic pages
+    python benchmarks/bench_table_extraction.py page.html --table-id stats_standard
+"""
+import argparse
+import io
+import json
+
+from common import measure, synthetic_fbref_page
+
+import pandas as pd
+import stats_merger
+
+
+def read_html_path(content, table_id):
+    """The previous approach: pd.read_html(content)[0], which parses every visible table of the page.
+
+    On the players page the stats table is the first one; synthetic pages put the
+    squad tables first, so the first table with a Player column stands in for [0].
+    The parse cost is the same either way. table_id is unused, as it was before.
+    """
+    dfs = pd.read_html(io.BytesIO(content))
+    df = next((df for df in dfs if 'Player' in df.columns.get_level_values(-1)), None)
+    if df is None:
+        raise ValueError("The stats table is hidden inside an HTML comment")
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(0)
+    return df[df['Player'] != 'Player'].reset_index(drop=True)
+
+
+def extractor_path(content, table_id):
+    """The new approach: slice out one table and parse only that fragment."""
+    df = stats_merger._extract_fbref_table(content, table_id)
+    df.columns = df.columns.droplevel(0)
+    return df
+
+
+def normalized(df):
+    """Parses numeric-looking columns so both paths compare by value, not by formatting."""
+    columns = []
+    for i in range(df.shape[1]): # By position: FBRef repeats names such as Gls across header groups
+        column = df.iloc[:, i]
+        try:
+            columns.append(pd.to_numeric(column))
+        except (TypeError, ValueError):
+            columns.append(column.astype(str).replace({'None': 'nan', '': 'nan'}))
+    return pd.concat(columns, axis=1, keys=range(len(columns)))
+
+
+def bench_page(label, content, table_id):
+    """Times both paths on one page and checks they agree."""
+    result = {'page': label, 'bytes': len(content)}
+    ours, result['extractor_s'], result['extractor_peak_bytes'] = measure(extractor_path, content, table_id)
+    result['rows'] = len(ours)
+    try:
+        ref, result['read_html_s'], result['read_html_peak_bytes'] = measure(read_html_path, content, table_id)
+    except (ValueError, ImportError): # read_html cannot see tables wrapped in HTML comments (and may then want html5lib)
+        result['read_html_s'] = None
+        return result
+    pd.testing.assert_frame_equal(normalized(ref), normalized(ours), check_dtype=False)
+    result['speedup'] = result['read_html_s'] / result['extractor_s']
+    result['memory_ratio'] = result['read_html_peak_bytes'] / result['extractor_peak_bytes']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help="Saved FBRef pages to benchmark.")
+    parser.add_argument('--table-id', default='stats_standard')
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 2800, 10000], help="Synthetic page sizes.")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = []
+    if args.pages:
+        for path in args.pages:
+            with open(path, 'rb') as fh:
+                results.append(bench_page(path, fh.read(), args.table_id))
+    else:
+        for n_rows in args.rows:
+            results.append(bench_page(f'synthetic-{n_rows}', synthetic_fbref_page(n_rows), 'stats_standard'))
+            results.append(bench_page(f'synthetic-{n_rows}-commented', synthetic_fbref_page(n_rows, commented=True), 'stats_standard'))
+
+    for r in results:
+        if r.get('read_html_s') is not None:
+            read_html = f"{r['read_html_s']:.3f}s/{r['read_html_peak_bytes'] / 2**20:.1f}MB"
+        else:
+            read_html = 'n/a'
+        extractor = f"{r['extractor_s']:.3f}s/{r['extractor_peak_bytes'] / 2**20:.1f}MB"
+        speedup = f"x{r['speedup']:.1f} time, x{r['memory_ratio']:.1f} peak" if 'speedup' in r else ''
+        print(f"{r['page']:<32} rows={r['rows']:<6} read_html={read_html:<15} extractor={extractor:<15} {speedup}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Shared helpers for the benchmark scripts: synthetic FBRef-like pages and timing."""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Benchmarks run from a checkout, not an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (over_header, column) pairs shaped like the Big5 standard stats table
+STANDARD_HEADER = (
+    [('', 'Rk'), ('', 'Player'), ('', 'Nation'), ('', 'Pos'), ('', 'Squad'), ('', 'Comp'), ('', 'Age'), ('', 'Born')]
+    + [('Playing Time', c) for c in ['MP', 'Starts', 'Min', '90s']]
+    + [('Performance', c) for c in ['Gls', 'Ast', 'G+A', 'G-PK', 'PK', 'PKatt', 'CrdY', 'CrdR']]
+    + [('Expected', c) for c in ['xG', 'npxG', 'xAG', 'npxG+xAG']]
+    + [('Progression', c) for c in ['PrgC', 'PrgP', 'PrgR']]
+    + [('Per 90 Minutes', c) for c in ['Gls', 'Ast', 'G+A', 'G-PK', 'G+A-PK', 'xG', 'xAG', 'xG+xAG', 'npxG', 'npxG+xAG']]
+    + [('', 'Matches')]
+)
+
+SQUADS = ['Arsenal', 'Barcelona', 'Bayern Munich', 'Inter', 'Paris S-G', 'Atletico Madrid', 'Dortmund', 'Milan',
+          'Real Madrid', 'Napoli', 'Lyon', 'Sevilla', 'Leverkusen', 'Roma', 'Marseille', 'Chelsea']
+COMPS = ['eng Premier League', 'es La Liga', 'de Bundesliga', 'it Serie A', 'fr Ligue 1']
+NATIONS = ['eng ENG', 'es ESP', 'fr FRA', 'br BRA', 'ar ARG', 'de GER', 'it ITA', 'pt POR', 'ci CIV', 'no NOR']
+POSITIONS = ['GK', 'DF', 'MF', 'FW', 'DF,MF', 'MF,FW', 'FW,MF']
+FIRST_NAMES = ['Jose', 'Kylian', 'Erling', 'Vinicius', 'Pedri', "N'Golo", 'Thomas', 'Luka', 'Jude', 'Ousmane', 'Bukayo']
+LAST_NAMES = ['Gimenez', 'Mbappe', 'Haaland', 'Junior', 'Gonzalez', 'Kante', 'Muller', 'Modric', 'Bellingham',
+              'Dembele', 'Saka', 'Ødegaard', 'Müller', 'Çalhanoğlu', "O'Reilly"]
+
+
+def synthetic_rows(n_rows, seed=0):
+    """Returns n_rows lists of cell strings matching STANDARD_HEADER."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        minutes = rng.randint(0, 3420)
+        row = [
+            str(i + 1), f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}', rng.choice(NATIONS),
+            rng.choice(POSITIONS), rng.choice(SQUADS), rng.choice(COMPS),
+            f'{rng.randint(16, 39)}-{rng.randint(0, 364):03d}', str(rng.randint(1984, 2008)),
+            str(rng.randint(0, 38)), str(rng.randint(0, 38)), f'{minutes:,}', f'{minutes / 90:.1f}',
+        ]
+        row += [str(rng.randint(0, 30)) for _ in range(8)]
+        row += [f'{rng.random() * 20:.1f}' for _ in range(4)]
+        row += [str(rng.randint(0, 150)) for _ in range(3)]
+        row += [f'{rng.random():.2f}' if minutes else '' for _ in range(10)]
+        row.append('Matches')
+        rows.append(row)
+    return rows
+
+
+def render_fbref_page(header, rows, table_id, commented=False, extra_tables=6):
+    """Renders (group, column) header and cell rows as an FBRef-like page with squad tables first."""
+    over = []
+    for top, _ in header:
+        if over and over[-1][0] == top:
+            over[-1][1] += 1
+        else:
+            over.append([top, 1])
+    over_row = ''.join(f'<th colspan="{span}">{top}</th>' for top, span in over)
+    header_row = ''.join(f'<th scope="col">{name}</th>' for _, name in header)
+    thead = f'<thead><tr class="over_header">{over_row}</tr><tr>{header_row}</tr></thead>'
+
+    body = []
+    for i, row in enumerate(rows):
+        if i and i % 25 == 0: # FBRef repeats the header every 25 rows
+            body.append(f'<tr class="thead">{header_row}</tr>')
+        cells = f'<th scope="row">{row[0]}</th>' + ''.join(f'<td>{cell}</td>' for cell in row[1:])
+        body.append(f'<tr>{cells}</tr>')
+    table = f'<table class="stats_table" id="{table_id}">{thead}<tbody>{"".join(body)}</tbody></table>'
+    if commented:
+        table = f'<div class="placeholder"></div>\n<!--\n{table}\n-->'
+
+    squad_tables = []
+    for t in range(extra_tables):
+        squad_rows = ''.join(
+            f'<tr><th>{squad}</th>' + ''.join(f'<td>{(t + j) % 17}</td>' for j in range(20)) + '</tr>'
+            for squad in SQUADS
+        )
+        squad_tables.append(
+            f'<table id="stats_squads_{t}"><thead><tr><th>Squad</th>'
+            + ''.join(f'<th>c{j}</th>' for j in range(20))
+            + f'</tr></thead><tbody>{squad_rows}</tbody></table>'
+        )
+    # The squad tables come first, as on FBRef, so read_html has to parse them too
+    return f'<html><head><meta charset="utf-8"><title>Big 5</title></head><body>{"".join(squad_tables)}{table}</body></html>'.encode('utf-8')
+
+
+def synthetic_fbref_page(n_rows, table_id='stats_standard', commented=False, extra_tables=6, seed=0):
+    """Builds an FBRef-like page: a few squad tables plus a standard stats table with table_id."""
+    return render_fbref_page(STANDARD_HEADER, synthetic_rows(n_rows, seed), table_id, commented, extra_tables)
+
+
+def synthetic_stat_page(spec, n_rows, n_stats=20, seed=0):
+    """Builds a page for a registered StatTable: identity columns, its renamed groups and n_stats stats.
+
+    The identity cells come from synthetic_rows(seed), so every stat page lists the same players.
+    """
+    header = list(STANDARD_HEADER[:8])
+    targets = set()
+    for key, target in spec.renames.items(): # Aliases for older seasons would duplicate a column
+        if target not in targets:
+            targets.add(target)
+            header.append(key)
+    for group in spec.group_suffixes:
+        header += [(group, f'{spec.name}_grp{k}') for k in range(4)]
+    header += [('Stats', f'{spec.name}_{k}') for k in range(n_stats)] + [('', 'Matches')]
+    rng = random.Random(f'{seed}-{spec.name}')
+    n_values = len(header) - 9
+    rows = [row[:8] + [f'{rng.random() * 50:.1f}' if k % 3 else str(rng.randint(0, 300)) for k in range(n_values)] + ['Matches']
+            for row in synthetic_rows(n_rows, seed)]
+    return render_fbref_page(header, rows, spec.table_id, commented=spec.name != 'standard')
+
+
+def synthetic_maestro_csv(n_rows, extra_rows=None, seed=0):
+    """Builds a players.csv-like maestro covering most synthetic players plus unrelated rows."""
+    rng = random.Random(seed)
+    extra_rows = n_rows * 5 if extra_rows is None else extra_rows
+    lines = ['name,sub_position,current_club_name,market_value_in_eur,last_season,foot,height_in_cm,'
+             'contract_expiration_date,date_of_birth,country_of_citizenship']
+    players = [(row[1], row[7]) for row in synthetic_rows(n_rows, seed)]
+    players += [(f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} x{i}', str(rng.randint(1980, 2008))) for i in range(extra_rows)]
+    for i, (name, born) in enumerate(players):
+        if i % 10 == 0:
+            continue # Some FBRef players are missing from the maestro
+        if i % 7 == 0:
+            name = name.replace('e', 'é', 1) # Spelling variants for identity matching
+        lines.append(','.join([
+            '"' + name.replace('"', '') + '"', rng.choice(['Centre-Back', 'Central Midfield', 'Centre-Forward']),
+            rng.choice(SQUADS), str(rng.randint(1, 200) * 500_000), '2024', rng.choice(['right', 'left', 'both']),
+            str(rng.randint(165, 200)), '2027-06-30', f'{born}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+            rng.choice(['England', 'Spain', 'France', 'Brazil', 'Argentina']),
+        ]))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def measure(func, *args, repeat=3, **kwargs):
+    """Runs func repeat times; returns (result, best wall seconds, peak traced bytes)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
@@ -3,7 +3,8 @@ from setuptools import setup
 setup(
     name='football_scraper_jose',  # Replace with your desired package name
     version='0.1',  # Start with version 0.1 or any version you'd like
-    py_modules=['stats_merger'],  # Name of the .py file (without the extension)
+    packages=['stats_merger'],  # Run with: python -m stats_merger
+    package_data={'stats_merger': ['data/*.json']},  # Lookup tables such as nation_codes.json
     install_requires=[  # List any external libraries your file depends on
         # For example, if your script needs numpy, add it here:
         # 'numpy',
@@ -0,0 +1,73 @@
+"""FBRef player stats scraper and merger for the Big5 (and other) leagues.
+
+Importing the package is cheap: submodules load the first time one of their names is
+used, and pandas, numpy, requests and unidecode only when a table is fetched or built.
+
+    pipeline   fetch, parse, merge and export; incremental updates, backfill, streaming
+    analytics  per-90 rates, percentiles, z-scores and similar players
+    replay     offline record/replay of FBRef responses
+    service    job queue and JSON query API
+
+Run it with ``python -m stats_merger`` (see ``--help``).
+"""
+import importlib
+import sys
+import types
+
+# Lookup order for names that are not listed in _EXPORTS (settings and private helpers)
+_SUBMODULES = ('pipeline', 'analytics', 'replay', 'service')
+
+_EXPORTS = {
+    'STAT_TABLES': 'pipeline', 'StatTable': 'pipeline', 'backfill': 'pipeline', 'fetch_stat_table': 'pipeline',
+    'get_fetch_stats': 'pipeline', 'get_memory_report': 'pipeline', 'get_span_stats': 'pipeline',
+    'http_cache_info': 'pipeline', 'merger_5leagues': 'pipeline', 'read_merged_data': 'pipeline',
+    'stream_merge': 'pipeline', 'write_prometheus_metrics': 'pipeline',
+    'compute_analytics': 'analytics', 'read_analytics': 'analytics', 'similar_players': 'analytics',
+    'update_analytics': 'analytics',
+    'record_fixtures': 'replay', 'replay_fixtures': 'replay',
+    'ScraperService': 'service', 'serve': 'service', 'start_service': 'service',
+}
+__all__ = sorted(_EXPORTS)
+
+
+def _submodule(name):
+    return importlib.import_module(f'{__name__}.{name}')
+
+
+def _owner(name):
+    """Returns the submodule that defines name, importing submodules in _SUBMODULES order."""
+    if name in _EXPORTS:
+        return _submodule(_EXPORTS[name])
+    for submodule in _SUBMODULES:
+        module = _submodule(submodule)
+        if name in vars(module):
+            return module
+    return None
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return _submodule(name)
+    owner = None if name.startswith('__') else _owner(name)
+    if owner is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(owner, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
+
+
+class _Package(types.ModuleType):
+    """Forwards assignments such as stats_merger._DATA_DIR = path to the submodule that reads them."""
+
+    def __setattr__(self, name, value):
+        is_submodule = isinstance(value, types.ModuleType) and value.__name__ == f'{__name__}.{name}'
+        owner = None if is_submodule or name.startswith('__') else _owner(name)
+        if owner is None:
+            super().__setattr__(name, value)
+        else:
+            setattr(owner, name, value)
+
+
+sys.modules[__name__].__class__ = _Package
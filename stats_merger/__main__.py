@@ -0,0 +1,92 @@
+"""Command line entry point: python -m stats_merger --help
+
+Only the pipeline settings are imported to build the parser; the pipeline stages, the
+service and the heavy dependencies load when a command actually needs them.
+"""
+from contextlib import nullcontext
+import argparse
+import json
+import os
+
+from . import pipeline
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog='python -m stats_merger', description="Scraper y merge de estadísticas de jugadores de FBRef.")
+    parser.add_argument('--season', type=int, help="Año de inicio de la temporada (p. ej. 2023 para 2023-2024). Por defecto la última completada.")
+    parser.add_argument('--seasons', type=int, nargs=2, metavar=('DESDE', 'HASTA'), help="Rango de años de inicio (inclusive) para un backfill.")
+    parser.add_argument('--competitions', nargs='+', default=['Big5'], choices=sorted(pipeline._COMPETITIONS), help="Competiciones a procesar.")
+    parser.add_argument('--merge-workers', type=int, default=None, help="Procesos para el merge/limpieza durante el backfill.")
+    parser.add_argument('--formats', nargs='+', default=list(pipeline._DEFAULT_EXPORT_FORMATS), choices=sorted(pipeline._EXPORTERS), help="Formatos de salida del merge final.")
+    parser.add_argument('--incremental', action='store_true', help="Solo re-mergea los jugadores que cambiaron desde la última ejecución.")
+    parser.add_argument('--streaming', action='store_true', help="Mergea y exporta por particiones con memoria acotada (temporadas y ligas una a una).")
+    parser.add_argument('--partition-by', default='hash', choices=pipeline._STREAM_PARTITION_MODES, help="Con --streaming: particiona por hash de PlSqu o por competición.")
+    parser.add_argument('--partitions', type=int, default=pipeline._STREAM_PARTITIONS, help="Con --streaming y --partition-by hash: número de particiones.")
+    parser.add_argument('--analytics', action='store_true', help="Tras el merge, calcula per-90, percentiles y z-scores de las temporadas que cambiaron.")
+    parser.add_argument('--neighbors', action='store_true', help="Con --analytics: guarda también el índice de jugadores similares.")
+    parser.add_argument('--memory-report', action='store_true', help="Guarda los bytes por columna antes/después del tipado en data/.")
+    parser.add_argument('--record-fixtures', metavar='DIR', help="Graba las páginas de la temporada y players.csv en DIR y termina.")
+    parser.add_argument('--replay', metavar='DIR', help="Ejecuta contra fixtures grabados en DIR servidos localmente, sin red.")
+    parser.add_argument('--manifest', default=None, help="Ruta del manifiesto de checkpoints del backfill.")
+    parser.add_argument('--cache-info', action='store_true', help="Muestra el tamaño y la antigüedad de la caché HTTP y termina.")
+    parser.add_argument('--serve', action='store_true', help="Arranca el servicio HTTP (cola de trabajos y consultas) en lugar de una ejecución única.")
+    parser.add_argument('--host', help="Con --serve: dirección de escucha (por defecto 127.0.0.1).")
+    parser.add_argument('--port', type=int, help="Con --serve: puerto de escucha (por defecto 8765).")
+    parser.add_argument('--metrics-log', metavar='FILE', help="Escribe cada etapa (span) como una línea JSON en FILE ('-' para stderr).")
+    parser.add_argument('--prometheus', metavar='FILE', help="Al terminar, guarda los totales por etapa y host en formato de texto Prometheus.")
+    parser.add_argument('--profile', nargs='*', metavar='SPAN', help="Adjunta cProfile y tracemalloc a las etapas indicadas (p. ej. parse maestro_join); sin nombres, a todas.")
+    return parser
+
+
+def main(argv=None):
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.streaming and args.incremental:
+        parser.error("--streaming y --incremental no se pueden combinar.")
+    if args.neighbors and not args.analytics:
+        parser.error("--neighbors requiere --analytics.")
+    if args.cache_info:
+        print(json.dumps(pipeline.http_cache_info(), indent=2))
+        return
+
+    pipeline._SPAN_LOG_PATH = args.metrics_log
+    if args.profile is not None:
+        pipeline._PROFILE_SPANS = set(args.profile) or {'*'}
+
+    print("--- Iniciando ejecución de stats_merger ---")
+    if args.record_fixtures:
+        from .replay import record_fixtures
+        record_fixtures(args.record_fixtures, start_year=args.season, competition=args.competitions[0])
+    else:
+        replay = nullcontext()
+        if args.replay:
+            from .replay import replay_fixtures
+            replay = replay_fixtures(args.replay)
+        with replay:
+            if args.serve:
+                from .service import serve
+                serve(args.host, args.port, formats=args.formats)
+            elif args.seasons or len(args.competitions) > 1:
+                first_year, last_year = args.seasons if args.seasons else (args.season, args.season)
+                years = [None] if first_year is None else list(range(first_year, last_year + 1))
+                if args.streaming:
+                    pipeline.stream_merge(years, competitions=args.competitions, formats=args.formats, partition_by=args.partition_by, partitions=args.partitions, manifest_path=args.manifest, memory_report=args.memory_report)
+                else:
+                    pipeline.backfill(years, competitions=args.competitions, manifest_path=args.manifest, merge_workers=args.merge_workers, formats=args.formats, memory_report=args.memory_report)
+            else:
+                # None will use the default (latest completed season), e.g. --season 2022 for 2022-2023.
+                pipeline.merger_5leagues(start_year=args.season, competition=args.competitions[0], formats=args.formats, incremental=args.incremental, memory_report=args.memory_report,
+                                         streaming=args.streaming, partition_by=args.partition_by, partitions=args.partitions)
+            if args.analytics and not args.serve:
+                from .analytics import update_analytics
+                for competition in args.competitions:
+                    update_analytics(competition=competition, neighbors=args.neighbors)
+    if args.prometheus:
+        pipeline.write_prometheus_metrics(args.prometheus)
+    if args.profile is not None:
+        print(f"Perfiles cProfile guardados en: {os.path.abspath(pipeline._PROFILE_DIR)} (ver con python -m pstats)")
+    print("--- Ejecución de stats_merger completada ---")
+
+
+if __name__ == '__main__':
+    main()
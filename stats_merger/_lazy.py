@@ -0,0 +1,37 @@
+"""Heavy dependencies, imported the first time one of their attributes is used."""
+import importlib
+from functools import lru_cache
+
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    After the import the module's namespace is copied onto the proxy, so later lookups
+    cost the same as on the module itself.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module '{self._lazy_name}'>"
+
+
+@lru_cache(maxsize=None)
+def _optional_module(name):
+    """Imports an optional dependency once; None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+np = _LazyModule('numpy')
+pd = _LazyModule('pandas')
+requests = _LazyModule('requests')
+unidecode = _LazyModule('unidecode')
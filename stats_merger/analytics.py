@@ -0,0 +1,270 @@
+"""Per-90 rates, Pos/Comp percentiles, z-scores and a similar-players index for merged seasons."""
+import hashlib
+import json
+import os
+import re
+
+from . import pipeline
+from ._lazy import np, pd
+from .pipeline import _generar_player_codes, _merged_output_name, _span, _write_atomic
+
+_ANALYTICS_VERSION = 2 # Bump when the derived columns change so every season recomputes
+_ANALYTICS_MIN_90S = 3.0 # Players below this many full matches get rates but no percentiles/z-scores
+_ANALYTICS_NEIGHBORS = 10
+_ANALYTICS_BLOCK_ROWS = 2048 # Rows per block of the similarity matrix product
+# Columns that are identities, denominators or player attributes rather than stats to normalize
+_ANALYTICS_SKIP_COLUMNS = {'Rk', 'Born', 'Age', 'DecimalAge', 'MP', 'Starts', 'Min', '90s', 'Mn/MP', 'Mn/Start', 'Mn/Sub',
+                           'market_value_in_eur', 'height_in_cm', 'last_season'}
+# Columns that already are rates, ranked as they are instead of divided by 90s: percentages and
+# per-90 values by name (Cmp%, Sh/90, SCA90, +/-90, Gls_p90), other ratios and averages listed.
+# Season totals such as +/-, xG+/- or 1/3 (passes into the final third) are counts.
+_RATE_COLUMN_RE = re.compile(r'%|(?<![_\d])90$') # The lookbehind skips numbered names such as stat_90
+_RATE_COLUMNS = {'G/Sh', 'G/SoT', 'npxG/Sh', 'Dist', 'PPM', 'On-Off_1', 'On-Off_2'}
+_ANALYTICS_KEY_COLUMNS = ['PlSqu', 'Player', 'Squad', 'Comp', 'Pos']
+
+def _analytics_dir():
+    """data/analytics, under the pipeline's _DATA_DIR in effect when called."""
+    return os.path.join(pipeline._DATA_DIR, 'analytics')
+
+def _nineties_played(df):
+    """Full matches played per row: the 90s column, or Min / 90."""
+    if '90s' in df.columns:
+        return pd.to_numeric(df['90s'], errors='coerce').to_numpy(dtype='float64')
+    if 'Min' in df.columns:
+        minutes = df['Min'].astype(str).str.replace(',', '', regex=False) # FBRef writes 1,234
+        return pd.to_numeric(minutes, errors='coerce').to_numpy(dtype='float64') / 90
+    return np.full(len(df), np.nan)
+
+def _ranked_positions(sorted_groups, sorted_values=None):
+    """For row-wise sorted arrays, returns (first, last) column index of each element's run.
+
+    A run is a block of equal group codes (and equal values, if given).
+    """
+    n = sorted_groups.shape[1]
+    change = np.ones(sorted_groups.shape, dtype=bool)
+    change[:, 1:] = sorted_groups[:, 1:] != sorted_groups[:, :-1]
+    if sorted_values is not None:
+        change[:, 1:] |= sorted_values[:, 1:] != sorted_values[:, :-1]
+    is_last = np.ones(sorted_groups.shape, dtype=bool)
+    is_last[:, :-1] = change[:, 1:]
+    positions = np.arange(n, dtype='int32')
+    first = np.maximum.accumulate(np.where(change, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(is_last, positions, n - 1)[:, ::-1], axis=1)[:, ::-1]
+    return first, last
+
+def _group_percentiles(values, groups):
+    """Percentile rank (0-100, ties averaged, like rank(pct=True)) of every value within its group.
+
+    values is (rows, columns) with NaN for missing; groups holds one code per row, -1 to
+    exclude it. All columns are ranked at once: an argsort by value and a stable argsort by
+    group order every column by (group, value), and the run boundaries of equal groups and equal values give the ranks.
+    Columns are processed as contiguous rows, and the group codes are int16 when they fit
+    so the second sort is a radix sort.
+    """
+    n, k = values.shape
+    out = np.full((k, n), np.nan, dtype='float32')
+    if n == 0 or k == 0:
+        return out.T
+    values = np.array(values.T, dtype='float64', order='C') # A copy: missing values are overwritten below
+    missing = np.isnan(values)
+    code_dtype = 'int16' if groups.max(initial=0) < np.iinfo('int16').max else 'int32'
+    codes = np.where(missing, -1, groups[None, :]).astype(code_dtype) # Missing values form no group
+    values[missing] = np.inf # NaNs take numpy's slow sort path; their group code already sets them apart
+    order = np.argsort(values, axis=1) # Ties are averaged, so only the group sort has to be stable
+    order = np.take_along_axis(order, np.argsort(np.take_along_axis(codes, order, axis=1), axis=1, kind='stable'), axis=1)
+    sorted_codes = np.take_along_axis(codes, order, axis=1)
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    group_first, group_last = _ranked_positions(sorted_codes)
+    tie_first, tie_last = _ranked_positions(sorted_codes, sorted_values)
+    ranks = ((tie_first + tie_last) / 2 - group_first + 1) / (group_last - group_first + 1) * 100
+    np.put_along_axis(out, order, ranks.astype('float32'), axis=1)
+    out[codes < 0] = np.nan
+    return out.T
+
+def _group_zscores(values, groups, n_groups):
+    """Z-score of every value against the mean/std of its group (population std), all columns at once."""
+    n, k = values.shape
+    codes = np.where(np.isnan(values), -1, groups[:, None]) + 1 # Bucket 0 collects excluded values
+    flat = (codes * k + np.arange(k)).ravel()
+    filled = np.nan_to_num(values).ravel()
+    size = (n_groups + 1) * k
+    counts = np.bincount(flat, minlength=size).reshape(n_groups + 1, k)
+    sums = np.bincount(flat, weights=filled, minlength=size).reshape(n_groups + 1, k)
+    squares = np.bincount(flat, weights=filled * filled, minlength=size).reshape(n_groups + 1, k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+        std = np.sqrt(np.maximum(squares / counts - mean * mean, 0))
+        std[std == 0] = np.nan
+        z = (values - np.take_along_axis(mean, codes, axis=0)) / np.take_along_axis(std, codes, axis=0)
+    z[codes == 0] = np.nan
+    return z.astype('float32')
+
+def compute_analytics(df):
+    """Derives per-90 rates, Pos/Comp percentiles and z-scores from a merged season table.
+
+    Count stats become <col>_per90 (divided by 90s, or Min / 90). Those rates and the columns
+    that already are rates get <col>_pct (0-100) and <col>_z within groups of primary
+    position (first entry of Pos) and Comp, among players with at least _ANALYTICS_MIN_90S.
+    Returns a frame keyed by PlSqu with the identity columns and the derived ones.
+    """
+    numeric = [col for col in df.select_dtypes(include='number').columns
+               if col not in _ANALYTICS_SKIP_COLUMNS and not str(col).endswith(('_pct', '_z', '_per90'))]
+    rates = [col for col in numeric if col in _RATE_COLUMNS or _RATE_COLUMN_RE.search(str(col))]
+    counts = [col for col in numeric if col not in rates]
+    nineties = _nineties_played(df)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        per90 = df[counts].to_numpy(dtype='float64', na_value=np.nan) / np.where(nineties > 0, nineties, np.nan)[:, None]
+
+    pos_group = df['Pos'].astype(str).str.split(',').str[0].str.strip() if 'Pos' in df.columns else pd.Series('', index=df.index)
+    comp = df['Comp'].astype(str) if 'Comp' in df.columns else pd.Series('', index=df.index)
+    groups, uniques = pd.factorize(pd.MultiIndex.from_arrays([pos_group, comp]))
+    groups = np.where(nineties >= _ANALYTICS_MIN_90S, groups, -1)
+
+    metric_names = [f'{col}_per90' for col in counts] + rates
+    metrics = np.hstack([per90, df[rates].to_numpy(dtype='float64', na_value=np.nan)]) if rates else per90
+    percentiles = _group_percentiles(metrics, groups)
+    zscores = _group_zscores(metrics, groups, len(uniques))
+
+    result = df[[col for col in _ANALYTICS_KEY_COLUMNS if col in df.columns]].reset_index(drop=True).copy()
+    result['PosGroup'] = pos_group.to_numpy()
+    result['90s'] = nineties.astype('float32')
+    derived = pd.concat([
+        pd.DataFrame(per90.astype('float32'), columns=metric_names[:len(counts)]),
+        pd.DataFrame(percentiles, columns=[f'{name}_pct' for name in metric_names]),
+        pd.DataFrame(zscores, columns=[f'{name}_z' for name in metric_names]),
+    ], axis=1)
+    return pd.concat([result, derived], axis=1)
+
+def _build_neighbor_index(analytics, k=None):
+    """Top-k cosine neighbours of every player among players of the same PosGroup.
+
+    Features are the percentile columns (missing = 50th). Each position is searched on its
+    own, in blocks of rows, so memory is O(block x players of that position).
+    Returns (neighbors int32 (n, k) with -1 padding, scores float32 (n, k)).
+    """
+    k = k or _ANALYTICS_NEIGHBORS
+    features = analytics[[col for col in analytics.columns if col.endswith('_pct')]].to_numpy(dtype='float32', na_value=50.0) - 50
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features = features / np.where(norms > 0, norms, 1)
+    positions, _ = pd.factorize(analytics['PosGroup'])
+    n = len(features)
+    neighbors = np.full((n, k), -1, dtype='int32')
+    scores = np.full((n, k), np.nan, dtype='float32')
+    for position in np.unique(positions):
+        members = np.flatnonzero(positions == position)
+        top_k = min(k, len(members) - 1)
+        if top_k <= 0:
+            continue
+        group = features[members]
+        for start in range(0, len(members), _ANALYTICS_BLOCK_ROWS):
+            stop = min(start + _ANALYTICS_BLOCK_ROWS, len(members))
+            sims = group[start:stop] @ group.T
+            sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf # Not yourself
+            top = np.argpartition(-sims, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            neighbors[members[start:stop], :top_k] = members[np.take_along_axis(top, order, axis=1)]
+            scores[members[start:stop], :top_k] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbors, scores
+
+def _analytics_paths(base_name, season):
+    """Returns the (table, neighbour index) paths of a season's analytics."""
+    stem = os.path.join(_analytics_dir(), f'{base_name}_{season}')
+    return f'{stem}.parquet', f'{stem}_neighbors.npz'
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def update_analytics(competition='Big5', seasons=None, neighbors=False, force=False):
+    """Recomputes the analytics of every merged season whose CSV changed since the last run.
+
+    Each season's merged CSV is hashed and compared with data/analytics/manifest.json, so
+    unchanged seasons are skipped. Results are stored as Parquet next to an optional
+    neighbour index (.npz). Returns the list of recomputed seasons.
+    """
+    try:
+        import pyarrow # noqa: F401 -- analytics are stored as Parquet
+    except ImportError:
+        print("Advertencia: pyarrow no está instalado. No se calculan las analíticas.")
+        return []
+    base_name = _merged_output_name(competition)
+    pattern = re.compile(rf'^{re.escape(base_name)}_(\d{{4}}-\d{{4}})\.csv$')
+    available = sorted(match.group(1) for match in map(pattern.match, os.listdir(pipeline._DATA_DIR) if os.path.isdir(pipeline._DATA_DIR) else []) if match)
+    if seasons is not None:
+        available = [season for season in available if season in set(seasons)]
+    manifest_path = os.path.join(_analytics_dir(), 'manifest.json')
+    try:
+        with open(manifest_path, encoding='utf-8') as fh:
+            manifest = json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+
+    recomputed = []
+    for season in available:
+        csv_path = os.path.join(pipeline._DATA_DIR, f'{base_name}_{season}.csv')
+        table_path, index_path = _analytics_paths(base_name, season)
+        fingerprint = {'source_sha256': _file_sha256(csv_path), 'version': _ANALYTICS_VERSION, 'neighbors': bool(neighbors)}
+        entry = manifest.get(f'{base_name}_{season}', {})
+        up_to_date = (entry.get('source_sha256'), entry.get('version')) == (fingerprint['source_sha256'], _ANALYTICS_VERSION)
+        has_index = entry.get('neighbors', False) and os.path.exists(index_path)
+        if not force and up_to_date and os.path.exists(table_path) and (not neighbors or has_index):
+            continue
+        if not neighbors and os.path.exists(index_path):
+            os.remove(index_path) # Would point at the rows of the previous table
+        with _span('analytics', season=season, competition=competition) as span:
+            merged = pd.read_csv(csv_path, encoding='utf-8')
+            span['rows_in'] = len(merged)
+            analytics = compute_analytics(merged)
+            os.makedirs(_analytics_dir(), exist_ok=True)
+            analytics.to_parquet(f'{table_path}.tmp', index=False, compression='zstd')
+            os.replace(f'{table_path}.tmp', table_path)
+            if neighbors:
+                neighbor_rows, scores = _build_neighbor_index(analytics)
+                with open(f'{index_path}.tmp', 'wb') as fh:
+                    np.savez_compressed(fh, keys=analytics['PlSqu'].astype(str).to_numpy(dtype='U'), neighbors=neighbor_rows, scores=scores)
+                os.replace(f'{index_path}.tmp', index_path)
+            span['rows_out'] = len(analytics)
+        manifest[f'{base_name}_{season}'] = fingerprint
+        _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+        recomputed.append(season)
+        print(f"Analíticas de {season} - {competition}: {analytics.shape[1] - len(_ANALYTICS_KEY_COLUMNS)} columnas derivadas.")
+    if not recomputed:
+        print(f"Analíticas de {competition} al día; no hay temporadas con cambios.")
+    return recomputed
+
+def read_analytics(season, competition='Big5', columns=None):
+    """Loads the precomputed analytics table of a season (only the requested columns)."""
+    table_path, _ = _analytics_paths(_merged_output_name(competition), season)
+    if columns is not None:
+        columns = list(dict.fromkeys(['PlSqu'] + list(columns)))
+    return pd.read_parquet(table_path, columns=columns)
+
+def similar_players(player, season, competition='Big5', k=None):
+    """Returns the most similar players (same PosGroup) to player, by PlSqu or name, from the neighbour index.
+
+    A name that matches several rows (e.g. a mid-season transfer) uses the first match.
+    """
+    table_path, index_path = _analytics_paths(_merged_output_name(competition), season)
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"No hay índice de vecinos para {season} - {competition}. Ejecuta con --analytics --neighbors.")
+    with np.load(index_path, allow_pickle=False) as index:
+        keys, neighbors, scores = index['keys'], index['neighbors'], index['scores']
+    table = pd.read_parquet(table_path, columns=['PlSqu', 'Player', 'Squad', 'Comp', 'Pos'])
+    matches = np.flatnonzero(keys == player)
+    if not len(matches):
+        slug = _generar_player_codes(pd.Series([player]))[0]
+        if slug:
+            codes = _generar_player_codes(table['Player']).fillna('')
+            matches = np.flatnonzero(codes.str.contains(slug, regex=False).to_numpy())
+    if not len(matches):
+        return table.iloc[0:0].assign(similarity=pd.Series(dtype='float32'))
+    row = matches[0]
+    found = neighbors[row] >= 0
+    limit = k or neighbors.shape[1]
+    result = table.iloc[neighbors[row][found][:limit]].reset_index(drop=True)
+    result['similarity'] = scores[row][found][:limit]
+    return result
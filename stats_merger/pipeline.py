@@ -0,0 +1,2225 @@
+"""FBRef scraping, cleaning, merge and export of the Big5 player stats.
+
+pandas, numpy, requests and unidecode are imported on first use (see _lazy), so importing
+this module is cheap until a table is fetched or a frame is built.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from ._lazy import _optional_module, np, pd, requests, unidecode
+try:
+    import resource
+except ImportError: # Not available on Windows; peak RSS is then left empty
+    resource = None
+import cProfile
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+_MAESTRO_URL = "https://raw.githubusercontent.com/Josegra/Football_Scraper/main/players.csv"
+
+_HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# On-disk HTTP cache settings. Bodies are stored once per content hash and indexed by URL.
+_HTTP_CACHE_ENABLED = True
+_HTTP_CACHE_DIR = os.path.join('.', 'cache', 'http')
+_HTTP_CACHE_TTL = 6 * 60 * 60 # Seconds a cached page is served without revalidating it
+_HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024 # LRU eviction kicks in above this size
+_HTTP_CACHE_LOCK = threading.Lock()
+
+# Request budget per host. FBRef blocks clients that go above ~10 requests per minute.
+_HOST_REQUESTS_PER_MINUTE = {'fbref.com': 10}
+_DEFAULT_REQUESTS_PER_MINUTE = 60
+_FETCH_WORKERS = 4
+_MAX_FETCH_RETRIES = 4
+
+# --- Helper Function ---
+def _get_season_string(start_year=None):
+    """Determines the season string, e.g., '2023-2024'."""
+    current_year = datetime.now().year
+    if start_year is None:
+        # FBRef uses the starting year for the season URL, e.g., 2023 for 2023-2024 season.
+        # If it's May 2025, the 2024-2025 season is the one likely just concluded or current.
+        # So, the year to use would be current_year - 1.
+        year_to_use = current_year - 1
+    else:
+        try:
+            year_to_use = int(start_year)
+        except ValueError:
+            print(f"Advertencia: start_year ('{start_year}') no válido. Usando {current_year - 1}.")
+            year_to_use = current_year - 1
+    return f"{year_to_use}-{year_to_use + 1}"
+
+# FBRef competition slugs: (id used in the /comps/ path, name used in the page slug)
+_COMPETITIONS = {
+    'Big5': ('Big5', 'Big-5-European-Leagues'),
+    'ENG': ('9', 'Premier-League'),
+    'ESP': ('12', 'La-Liga'),
+    'ITA': ('11', 'Serie-A'),
+    'GER': ('20', 'Bundesliga'),
+    'FRA': ('13', 'Ligue-1'),
+    'POR': ('32', 'Primeira-Liga'),
+    'NED': ('23', 'Eredivisie'),
+    'ENG2': ('10', 'Championship'),
+}
+
+_FBREF_BASE_URL = 'https://fbref.com' # Pointed at a local server by replay_fixtures
+_STATS_URL_TEMPLATE = '{base_url}/en/comps/{comp_id}/{season}/{path}/players/{season}-{comp_name}-Stats'
+_LOCAL_URL_RE = re.compile(r'^http://(localhost|127\.0\.0\.1)(:\d+)?/') # Plain HTTP is allowed for local servers
+
+def _build_stats_url(stat_path, season, competition='Big5', url_template=_STATS_URL_TEMPLATE):
+    """Builds the FBRef player stats URL for a stat page, season and competition slug."""
+    if competition not in _COMPETITIONS:
+        raise ValueError(f"Competición desconocida: '{competition}'. Opciones: {', '.join(_COMPETITIONS)}")
+    comp_id, comp_name = _COMPETITIONS[competition]
+    return url_template.format(base_url=_FBREF_BASE_URL, comp_id=comp_id, season=season, path=stat_path, comp_name=comp_name)
+
+def _merged_output_name(competition='Big5'):
+    """Base file name of the merged output; Big5 keeps its historical name."""
+    return 'final_fbref_all5_merged_data' if competition == 'Big5' else f'final_fbref_{competition.lower()}_merged_data'
+
+# --- Instrumentation ---
+# Spans are always kept in memory for get_span_stats and the Prometheus dump;
+# they are also written as JSON lines when _SPAN_LOG_PATH is set ('-' for stderr).
+_SPAN_LOG_PATH = None
+_PROFILE_SPANS = set() # Span names that get cProfile/tracemalloc attached; '*' profiles every span
+_PROFILE_DIR = os.path.join('.', 'cache', 'profiles')
+_PROFILE_LABEL_RE = re.compile(r'[^\w.-]+') # Characters replaced in profile file names
+# Span, fetch and memory records are capped so a long-running service does not grow without bound;
+# beyond the cap the oldest records are dropped from the summaries.
+_MAX_RECORDS = 50_000
+_span_records = deque(maxlen=_MAX_RECORDS)
+_span_records_lock = threading.Lock()
+_span_local = threading.local()
+_span_ids = itertools.count(1)
+_profile_lock = threading.Lock() # cProfile and tracemalloc are process-wide: one profiled span at a time
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where it is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # Linux reports KiB
+
+def _open_spans():
+    """Returns this thread's stack of open span records."""
+    stack = getattr(_span_local, 'stack', None)
+    if stack is None:
+        stack = _span_local.stack = []
+    return stack
+
+@contextmanager
+def _span(name, **attrs):
+    """Times a pipeline stage and yields its record; callers may set rows_in/rows_out on it.
+
+    wall_s is elapsed time and cpu_s the CPU time of the calling thread. HTTP requests
+    made on the same thread while the span is open are counted in it and its parents.
+    """
+    stack = _open_spans()
+    record = {
+        'span': name, 'id': next(_span_ids), 'parent': stack[-1]['id'] if stack else None,
+        'start': datetime.now().isoformat(timespec='milliseconds'), 'pid': os.getpid(),
+        'thread': threading.current_thread().name, **attrs, 'rows_in': None, 'rows_out': None,
+        'http_requests': 0, 'http_retries': 0, 'http_status': {}, 'http_wait_s': 0.0,
+        'http_cache_hits': 0, 'bytes_downloaded': 0,
+    }
+    profiler = _start_profile(name)
+    stack.append(record)
+    started, cpu_started = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    except BaseException as exc:
+        record['error'] = type(exc).__name__
+        raise
+    finally:
+        record['wall_s'] = time.perf_counter() - started
+        record['cpu_s'] = time.thread_time() - cpu_started
+        stack.pop()
+        if profiler is not None:
+            _stop_profile(profiler, record)
+        record['peak_rss_bytes'] = _peak_rss_bytes()
+        _emit_span(record)
+
+def _start_profile(name):
+    """Starts cProfile and tracemalloc if name was selected with --profile and no span is being profiled."""
+    if not _PROFILE_SPANS & {name, '*'} or not _profile_lock.acquire(blocking=False):
+        return None
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler, started_tracing
+
+def _stop_profile(state, record):
+    """Saves the span's cProfile stats and adds its tracemalloc peak and top allocations to record."""
+    profiler, started_tracing = state
+    try:
+        profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:10]
+        if started_tracing:
+            tracemalloc.stop()
+        os.makedirs(_PROFILE_DIR, exist_ok=True)
+        label = _PROFILE_LABEL_RE.sub('_', '-'.join(str(record[k]) for k in ('span', 'stat', 'season') if record.get(k)))
+        path = os.path.join(_PROFILE_DIR, f"{label}-{record['pid']}-{record['id']}.prof")
+        profiler.dump_stats(path)
+        record['profile'] = path
+        record['tracemalloc_peak_bytes'] = peak
+        record['tracemalloc_top'] = [f'{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size}' for stat in top]
+    finally:
+        _profile_lock.release()
+
+def _note_fetch(status, retries, waited, size):
+    """Adds one HTTP request to every span open on this thread."""
+    for record in _open_spans():
+        record['http_requests'] += 1
+        record['http_retries'] += retries > 0
+        record['http_wait_s'] += waited
+        record['bytes_downloaded'] += size
+        record['http_status'][str(status)] = record['http_status'].get(str(status), 0) + 1
+
+def _note_cache_hit():
+    """Counts a page served from the HTTP cache without a request in every open span."""
+    for record in _open_spans():
+        record['http_cache_hits'] += 1
+
+def _emit_span(record):
+    """Stores a finished span and writes it as one JSON line if a span log is configured."""
+    with _span_records_lock:
+        _span_records.append(record)
+        if not _SPAN_LOG_PATH:
+            return
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        if _SPAN_LOG_PATH == '-':
+            print(line, file=sys.stderr, flush=True)
+        else:
+            os.makedirs(os.path.dirname(_SPAN_LOG_PATH) or '.', exist_ok=True)
+            with open(_SPAN_LOG_PATH, 'a', encoding='utf-8') as fh:
+                fh.write(line + '\n')
+
+def get_span_stats(reset=False):
+    """Returns a per-stage summary (runs, time, rows, downloads) of the spans recorded so far."""
+    columns = ['span', 'stat', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'http_requests', 'http_retries', 'bytes_downloaded', 'peak_rss_bytes']
+    with _span_records_lock:
+        records = pd.DataFrame([{col: r.get(col) for col in columns} for r in _span_records], columns=columns)
+        if reset:
+            _span_records.clear()
+    if records.empty:
+        return records
+    records['stat'] = records['stat'].fillna('')
+    grouped = records.groupby(['span', 'stat'], sort=False)
+    return pd.DataFrame({
+        'runs': grouped.size(),
+        'wall_total_s': grouped['wall_s'].sum(),
+        'wall_max_s': grouped['wall_s'].max(),
+        'cpu_total_s': grouped['cpu_s'].sum(),
+        'rows_in': grouped['rows_in'].sum(min_count=1),
+        'rows_out': grouped['rows_out'].sum(min_count=1),
+        'http_requests': grouped['http_requests'].sum(),
+        'http_retries': grouped['http_retries'].sum(),
+        'bytes_downloaded': grouped['bytes_downloaded'].sum(),
+        'peak_rss_bytes': grouped['peak_rss_bytes'].max(),
+    })
+
+def _prometheus_labels(**labels):
+    """Formats labels as {name="value",...} with Prometheus escaping."""
+    escaped = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+def _prometheus_text():
+    """Renders span and HTTP totals in the Prometheus text exposition format."""
+    with _span_records_lock:
+        spans = list(_span_records)
+    with _fetch_records_lock:
+        fetches = list(_fetch_records)
+
+    stage_totals = {}
+    for r in spans:
+        totals = stage_totals.setdefault((r['span'], r.get('stat') or ''), {'runs': 0, 'errors': 0, 'wall': 0.0, 'cpu': 0.0, 'rows_out': 0})
+        totals['runs'] += 1
+        totals['errors'] += 'error' in r
+        totals['wall'] += r['wall_s']
+        totals['cpu'] += r['cpu_s']
+        totals['rows_out'] += r['rows_out'] or 0
+    http_totals = {}
+    for f in fetches:
+        totals = http_totals.setdefault((f['host'], str(f['status'])), {'requests': 0, 'retries': 0, 'bytes': 0, 'wait': 0.0, 'latency': 0.0})
+        totals['requests'] += 1
+        totals['retries'] += f['retry'] > 0
+        totals['bytes'] += f['bytes']
+        totals['wait'] += f['wait_s']
+        totals['latency'] += f['latency_s']
+
+    metrics = [
+        ('fbref_stage_runs_total', 'counter', 'Completed pipeline spans.', stage_totals, 'runs'),
+        ('fbref_stage_errors_total', 'counter', 'Spans that ended with an exception.', stage_totals, 'errors'),
+        ('fbref_stage_wall_seconds_total', 'counter', 'Wall time spent in pipeline spans.', stage_totals, 'wall'),
+        ('fbref_stage_cpu_seconds_total', 'counter', 'CPU time of the thread running each span.', stage_totals, 'cpu'),
+        ('fbref_stage_rows_out_total', 'counter', 'Rows produced by pipeline spans.', stage_totals, 'rows_out'),
+        ('fbref_http_requests_total', 'counter', 'HTTP requests sent.', http_totals, 'requests'),
+        ('fbref_http_retries_total', 'counter', 'HTTP requests that were retries after 403/429.', http_totals, 'retries'),
+        ('fbref_http_downloaded_bytes_total', 'counter', 'Response bytes downloaded.', http_totals, 'bytes'),
+        ('fbref_http_wait_seconds_total', 'counter', 'Time spent waiting for the per-host rate limit.', http_totals, 'wait'),
+        ('fbref_http_latency_seconds_total', 'counter', 'Time spent in HTTP requests.', http_totals, 'latency'),
+    ]
+    lines = []
+    for name, kind, help_text, totals, field_name in metrics:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for key, values in totals.items():
+            labels = _prometheus_labels(stage=key[0], stat=key[1]) if totals is stage_totals else _prometheus_labels(host=key[0], status=key[1])
+            lines.append(f'{name}{labels} {values[field_name]}')
+    peak_rss = _peak_rss_bytes()
+    if peak_rss is not None:
+        lines += ['# HELP fbref_process_peak_rss_bytes Peak resident set size of the process.',
+                  '# TYPE fbref_process_peak_rss_bytes gauge', f'fbref_process_peak_rss_bytes {peak_rss}']
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus_metrics(path):
+    """Writes the span and HTTP totals so far to path in the Prometheus text format."""
+    _write_atomic(path, _prometheus_text().encode('utf-8'))
+    print(f"Métricas Prometheus guardadas en: {os.path.abspath(path)}")
+
+# --- Rate-Limited Fetch Scheduling ---
+class _TokenBucket:
+    """Per-host token bucket that backs off on 429/403 and recovers on success."""
+
+    def __init__(self, requests_per_minute, burst=1):
+        self.base_rate = requests_per_minute / 60.0
+        self.rate = self.base_rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after=None):
+        """Halves the rate and pauses the host for retry_after seconds (or one slot)."""
+        with self.lock:
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            self.tokens = 0.0
+
+    def reward(self):
+        """Moves the rate back towards the configured budget after a successful request."""
+        with self.lock:
+            self.rate = min(self.base_rate, self.rate * 1.25)
+
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+_session_local = threading.local()
+_fetch_records = deque(maxlen=_MAX_RECORDS)
+_fetch_records_lock = threading.Lock()
+
+def _get_host_bucket(host):
+    """Returns the shared token bucket for host, creating it on first use."""
+    with _host_buckets_lock:
+        if host not in _host_buckets:
+            budget = _DEFAULT_REQUESTS_PER_MINUTE
+            for known_host, host_budget in _HOST_REQUESTS_PER_MINUTE.items():
+                if host == known_host or host.endswith('.' + known_host):
+                    budget = host_budget
+            _host_buckets[host] = _TokenBucket(budget)
+        return _host_buckets[host]
+
+def _get_session():
+    """Returns this thread's pooled requests.Session."""
+    session = getattr(_session_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=_FETCH_WORKERS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session_local.session = session
+    return session
+
+def _parse_retry_after(value):
+    """Converts a Retry-After header (seconds or HTTP date) to seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(tz=retry_at.tzinfo)).total_seconds())
+
+def _http_get(url, headers=None, timeout=30):
+    """GET through the per-host token bucket, retrying 429/403 with adaptive backoff."""
+    host = urlparse(url).hostname or ''
+    bucket = _get_host_bucket(host)
+    retries = 0
+    while True:
+        waited = bucket.acquire()
+        started = time.perf_counter()
+        try:
+            response = _get_session().get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.RequestException:
+            _record_fetch(url, host, None, time.perf_counter() - started, waited, retries, 0)
+            raise
+        _record_fetch(url, host, response.status_code, time.perf_counter() - started, waited, retries, len(response.content))
+        if response.status_code in (403, 429) and retries < _MAX_FETCH_RETRIES:
+            retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+            print(f"Aviso: {host} respondió {response.status_code}. Reintentando ({retries + 1}/{_MAX_FETCH_RETRIES}) con menor ritmo.")
+            bucket.penalize(retry_after)
+            retries += 1
+            continue
+        if response.status_code < 400:
+            bucket.reward()
+        return response
+
+def _record_fetch(url, host, status, latency, waited, retries, size):
+    """Stores one request's timings for get_fetch_stats and the open spans."""
+    _note_fetch(status, retries, waited, size)
+    with _fetch_records_lock:
+        _fetch_records.append({
+            'url': url, 'host': host, 'status': status, 'latency_s': latency,
+            'wait_s': waited, 'retry': retries, 'bytes': size,
+        })
+
+def get_fetch_stats(reset=False):
+    """Returns a per-host summary of request latency and rate-limit wait time."""
+    with _fetch_records_lock:
+        records = pd.DataFrame(list(_fetch_records), columns=['url', 'host', 'status', 'latency_s', 'wait_s', 'retry', 'bytes'])
+        if reset:
+            _fetch_records.clear()
+    if records.empty:
+        return records
+    grouped = records.groupby('host')
+    return pd.DataFrame({
+        'requests': grouped.size(),
+        'errors': grouped['status'].apply(lambda s: int((s.isna() | (s >= 400)).sum())),
+        'retries': grouped['retry'].apply(lambda s: int((s > 0).sum())),
+        'latency_mean_s': grouped['latency_s'].mean(),
+        'latency_p95_s': grouped['latency_s'].quantile(0.95),
+        'latency_max_s': grouped['latency_s'].max(),
+        'wait_total_s': grouped['wait_s'].sum(),
+        'wait_max_s': grouped['wait_s'].max(),
+        'bytes': grouped['bytes'].sum(),
+    })
+
+# --- HTTP Response Cache ---
+_SEASON_IN_URL_RE = re.compile(r'/(\d{4})-(\d{4})/')
+
+def _is_season_frozen(season_str):
+    """True if a 'YYYY-YYYY' season is completed and its FBRef pages no longer change."""
+    end_year = int(season_str.split('-')[1])
+    now = datetime.now()
+    # Seasons end in May/June; leave July for FBRef to publish late corrections.
+    return end_year < now.year or (end_year == now.year and now.month > 7)
+
+def _is_frozen_url(url):
+    """True if the URL belongs to a completed season."""
+    match = _SEASON_IN_URL_RE.search(url)
+    return match is not None and _is_season_frozen(f'{match.group(1)}-{match.group(2)}')
+
+def _cache_entry_paths(url):
+    """Returns the (meta, bodies dir) paths used to cache url."""
+    url_key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(_HTTP_CACHE_DIR, 'index', f'{url_key}.json'), os.path.join(_HTTP_CACHE_DIR, 'bodies')
+
+def _write_atomic(path, data):
+    """Writes bytes to path through a temporary file so readers never see partial data."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # A unique name per call: threads of one process may write the same path concurrently
+    fd, tmp_path = tempfile.mkstemp(prefix=f'{os.path.basename(path)}.', suffix='.tmp', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _read_cache_entry(url):
+    """Returns (meta, body) for a cached URL, or (None, None) if missing or corrupt."""
+    meta_path, bodies_dir = _cache_entry_paths(url)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as fh:
+            meta = json.load(fh)
+        with open(os.path.join(bodies_dir, meta['body']), 'rb') as fh:
+            body = fh.read()
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if hashlib.sha256(body).hexdigest() != meta['body']:
+        return None, None
+    return meta, body
+
+def _write_cache_entry(url, meta, body=None):
+    """Stores meta (and body, if given) for url and enforces the cache size bound."""
+    meta_path, bodies_dir = _cache_entry_paths(url)
+    if body is not None:
+        body_key = hashlib.sha256(body).hexdigest()
+        body_path = os.path.join(bodies_dir, body_key)
+        if not os.path.exists(body_path):
+            _write_atomic(body_path, body)
+        meta['body'] = body_key
+        meta['size'] = len(body)
+    meta['url'] = url
+    _write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+    if body is not None:
+        with _HTTP_CACHE_LOCK:
+            _evict_http_cache()
+
+def _touch_cache_entry(url):
+    """Marks a cache hit for the LRU by bumping the index file's mtime instead of rewriting it."""
+    meta_path, _ = _cache_entry_paths(url)
+    try:
+        os.utime(meta_path)
+    except OSError: # Evicted meanwhile; the body was already read
+        pass
+
+def _last_access(meta_path):
+    """Last write or hit of a cached URL (the index file's mtime), 0 if it is gone."""
+    try:
+        return os.path.getmtime(meta_path)
+    except OSError:
+        return 0
+
+def _read_cache_index():
+    """Returns (meta path, meta) for every cached URL, dropping corrupt index files."""
+    index_dir = os.path.join(_HTTP_CACHE_DIR, 'index')
+    if not os.path.isdir(index_dir):
+        return []
+    entries = []
+    for name in os.listdir(index_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(index_dir, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                entries.append((path, json.load(fh)))
+        except ValueError:
+            os.remove(path)
+        except OSError:
+            continue
+    return entries
+
+def _evict_http_cache(max_bytes=None):
+    """Drops least recently used entries until the cached bodies fit in max_bytes."""
+    max_bytes = _HTTP_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    bodies_dir = os.path.join(_HTTP_CACHE_DIR, 'bodies')
+    entries = _read_cache_index()
+    if not entries:
+        return
+    # Several URLs may share a body, so sizes are counted once per body.
+    body_sizes = {meta.get('body'): meta.get('size', 0) for _, meta in entries}
+    total = sum(body_sizes.values())
+    if total <= max_bytes:
+        return
+    entries.sort(key=lambda item: _last_access(item[0]))
+    referenced = {}
+    for _, meta in entries:
+        referenced[meta.get('body')] = referenced.get(meta.get('body'), 0) + 1
+    for path, meta in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        body_key = meta.get('body')
+        referenced[body_key] -= 1
+        if referenced[body_key] == 0:
+            try:
+                os.remove(os.path.join(bodies_dir, body_key))
+            except OSError:
+                pass
+            total -= body_sizes.get(body_key, 0)
+
+def http_cache_info():
+    """Summarizes the on-disk HTTP cache (needs no pandas, so it is cheap to call from the CLI)."""
+    entries = [meta for _, meta in _read_cache_index()]
+    now = time.time()
+    fetched = [meta.get('fetched_at', 0) for meta in entries]
+    return {
+        'dir': os.path.abspath(_HTTP_CACHE_DIR),
+        'urls': len(entries),
+        'bodies': len({meta.get('body') for meta in entries}),
+        'bytes': sum({meta.get('body'): meta.get('size', 0) for meta in entries}.values()),
+        'max_bytes': _HTTP_CACHE_MAX_BYTES,
+        'frozen_urls': sum(_is_frozen_url(meta.get('url', '')) for meta in entries),
+        'fresh_urls': sum(now - t <= _HTTP_CACHE_TTL for t in fetched),
+        'oldest_fetch': datetime.fromtimestamp(min(fetched)).isoformat(timespec='seconds') if fetched else None,
+        'newest_fetch': datetime.fromtimestamp(max(fetched)).isoformat(timespec='seconds') if fetched else None,
+    }
+
+def _cached_get(url, headers=None, timeout=30, ttl=None, frozen=None):
+    """Returns the body of url, reusing the on-disk cache and revalidating with ETag/Last-Modified."""
+    headers = dict(_HTTP_HEADERS if headers is None else headers)
+    if not _HTTP_CACHE_ENABLED:
+        response = _http_get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    ttl = _HTTP_CACHE_TTL if ttl is None else ttl
+    frozen = _is_frozen_url(url) if frozen is None else frozen
+    meta, body = _read_cache_entry(url)
+    if meta is not None:
+        age = time.time() - meta.get('fetched_at', 0)
+        if frozen or age < ttl:
+            _touch_cache_entry(url)
+            _note_cache_hit()
+            return body
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+    response = _http_get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and meta is not None:
+        meta['fetched_at'] = time.time()
+        _write_cache_entry(url, meta)
+        return body
+    response.raise_for_status()
+    new_meta = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'fetched_at': time.time(),
+    }
+    _write_cache_entry(url, new_meta, response.content)
+    return response.content
+
+# --- HTML Table Extraction ---
+def _coerce_table_column(values):
+    """Builds a typed column from cell strings: numeric when every cell parses, text otherwise."""
+    column = pd.Series(values, dtype='object')
+    try:
+        return pd.to_numeric(column, errors='raise') # Empty cells become NaN
+    except (ValueError, TypeError):
+        pass
+    try:
+        # FBRef writes thousands with commas ('1,234'), which read_html also strips
+        return pd.to_numeric(column.str.replace(',', '', regex=False), errors='raise')
+    except (ValueError, TypeError):
+        return column.where(column != '', None)
+
+def _extract_fbref_table(content, table_id):
+    """Extracts the table with table_id without parsing the rest of the page.
+
+    FBRef pages carry many tables and hide most of them inside HTML comments, so
+    the raw bytes are sliced around the table (comment markers fall outside the
+    slice) and only that fragment is parsed with lxml. Returns None when the table
+    or lxml is not available so callers can fall back to pd.read_html.
+    """
+    etree = _optional_module('lxml.etree')
+    if etree is None:
+        return None
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    id_pos = content.find(f'id="{table_id}"'.encode('utf-8'))
+    if id_pos < 0:
+        return None
+    table_start = content.rfind(b'<table', 0, id_pos)
+    table_end = content.find(b'</table>', id_pos)
+    if table_start < 0 or table_end < 0:
+        return None
+    fragment = content[table_start:table_end + len(b'</table>')]
+
+    # The fragment has no <meta charset>, and lxml's HTML parser would otherwise assume latin-1
+    root = etree.fromstring(fragment, etree.HTMLParser(encoding='utf-8'))
+    table = root.find('.//table') if root is not None else None
+    if table is None:
+        return None
+    header_rows = []
+    body_rows = []
+    for row in table.iter('tr'):
+        if row.getparent().tag == 'thead':
+            header_rows.append([(''.join(cell.itertext()).strip(), int(cell.get('colspan', 1) or 1))
+                                for cell in row if cell.tag in ('th', 'td')])
+            continue
+        row_class = row.get('class')
+        if row_class and {'thead', 'spacer'} & set(row_class.split()): # Repeated header rows
+            continue
+        # Most cells are a bare number: read .text and only walk the children of cells with links
+        body_rows.append([(cell.text or '').strip() if not len(cell) else ''.join(cell.itertext()).strip()
+                          for cell in row if cell.tag in ('th', 'td')])
+    if not header_rows:
+        return None
+
+    # The last header row names the columns; an optional row above groups them (colspan).
+    names = [text for text, _ in header_rows[-1]]
+    n_cols = len(names)
+    body_rows = [cells if len(cells) == n_cols else (cells + [''] * n_cols)[:n_cols] for cells in body_rows]
+    columns = [list(values) for values in zip(*body_rows)] if body_rows else [[] for _ in range(n_cols)]
+    del body_rows, table, root # Keep one copy of the cell strings, dropped column by column below
+    data = {}
+    for i in range(n_cols):
+        data[i] = _coerce_table_column(columns[i])
+        columns[i] = None
+    df = pd.DataFrame(data)
+    if len(header_rows) > 1:
+        tops = []
+        for text, span in header_rows[-2]:
+            tops.extend([text] * span)
+        tops = (tops + [''] * n_cols)[:n_cols]
+        df.columns = pd.MultiIndex.from_arrays([tops, names])
+    else:
+        df.columns = names
+    return df
+
+# --- Vectorized Normalization ---
+_NATION_CODE_RE = re.compile(r'^(\w+)') # 'eng ENG' -> 'eng'
+_COMP_NAME_RE = re.compile(r'^\w+\s+(.*)') # 'eng Premier League' -> 'Premier League'
+_LOOKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def _load_lookup(name):
+    """Reads a {code: name} table shipped in stats_merger/data."""
+    with open(os.path.join(_LOOKUP_DIR, name), encoding='utf-8') as fh:
+        return json.load(fh)
+
+_NATION_NAMES = _load_lookup('nation_codes.json') # FBRef flag code ('eng', 'es', ...) -> country name
+
+@lru_cache(maxsize=None)
+def _unidecode_cached(value):
+    """Memoized unidecode; player and squad names repeat across tables and seasons."""
+    return unidecode.unidecode(value)
+
+def _map_unique(series, func, null_value=None):
+    """Applies func once per distinct non-null value of series and broadcasts the results."""
+    codes, uniques = pd.factorize(series)
+    # The trailing null_value is picked up by the -1 code pandas uses for missing values
+    mapped = np.array([func(value) for value in uniques] + [null_value], dtype=object)
+    return pd.Series(mapped[codes], index=series.index, dtype=object)
+
+def _transliterar(series):
+    """Transliterates names to ASCII (unidecode), leaving missing values untouched."""
+    return _map_unique(series, lambda value: _unidecode_cached(str(value)), null_value=np.nan)
+
+def _age_to_decimal(age):
+    """'25-123' -> 25.337 (unrounded), '25' -> 25.0, anything else -> NaN."""
+    years, _, days = str(age).partition('-')
+    days = days.partition('-')[0]
+    try:
+        return int(years) + (int(days) if days else 0) / 365
+    except ValueError:
+        return np.nan
+
+def _edades_a_decimal(ages):
+    """Converts FBRef 'YY-DDD' ages to decimal years, e.g. '25-123' -> 25.34."""
+    if pd.api.types.is_numeric_dtype(ages):
+        return np.trunc(ages.astype('float64')) # Plain years
+    # Ages repeat a lot (a few thousand distinct 'YY-DDD' values per season), so each is parsed once
+    codes, uniques = pd.factorize(ages)
+    decimal = np.array([_age_to_decimal(age) for age in uniques] + [np.nan], dtype='float64')
+    return pd.Series(np.round(decimal, 2)[codes], index=ages.index)
+
+def _player_code(name):
+    """Maestro join key of one name; None when nothing is left after cleaning."""
+    slug = str(name).lower().strip().replace("'", '').replace(' ', '-')
+    return _unidecode_cached(slug) or None
+
+def _generar_player_codes(names):
+    """Builds the maestro join key from player names, e.g. "N'Golo Kanté" -> 'ngolo-kante'."""
+    return _map_unique(names, _player_code)
+
+# --- Stat Scraping Functions (Comments and logic preserved, minor adjustments) ---
+def _fetch_and_clean_fbref_table(url, table_id=None, stat=None):
+    """Fetches and performs initial cleaning of an FBRef table (the one with table_id, if given).
+
+    With a StatTable, headers are flattened and typed by its renames/dtypes in one step.
+    """
+    try:
+        if not url.startswith("https://"):
+            is_local = _LOCAL_URL_RE.match(url) is not None
+            if not is_local:
+                print(f"Advertencia: La URL {url} no usa HTTPS. Intentando con HTTPS.")
+                if url.startswith("http://"):
+                    url = url.replace("http://", "https://", 1)
+        stat_name = stat.name if stat is not None else None
+        with _span('fetch', stat=stat_name, url=url):
+            content = _cached_get(url, headers=_HTTP_HEADERS, timeout=30)
+        with _span('parse', stat=stat_name) as span:
+            df = _extract_fbref_table(content, table_id) if table_id else None
+            if df is None:
+                if table_id:
+                    print(f"Advertencia: tabla '{table_id}' no extraída directamente de {url}. Usando pd.read_html.")
+                dfs = pd.read_html(io.BytesIO(content), encoding='utf-8')
+                if not dfs:
+                    print(f"No se encontraron tablas en {url}")
+                    return pd.DataFrame()
+                df = dfs[0].copy() # Use .copy() early
+            span['rows_out'] = len(df)
+        with _span('clean', stat=stat_name) as span:
+            span['rows_in'] = len(df)
+            df = _clean_fbref_table(df, stat)
+            span['rows_out'] = len(df)
+        return df
+    except requests.exceptions.HTTPError as http_err:
+        print(f"Error HTTP al leer datos de {url}: {http_err} (Status: {http_err.response.status_code})")
+        if http_err.response.status_code == 403:
+            print("Error 403 Forbidden. El servidor está bloqueando la solicitud.")
+        elif http_err.response.status_code == 404:
+            print(f"Error 404: Página no encontrada en {url}.")
+        return pd.DataFrame()
+    except requests.exceptions.RequestException as e:
+        print(f"Error de red o HTTP al leer datos de {url}: {e}")
+        return pd.DataFrame()
+    except ValueError as ve: # Handles cases where read_html finds no tables
+        print(f"Error al parsear HTML (posiblemente no hay tablas válidas) de {url}: {ve}")
+        return pd.DataFrame()
+    except Exception as e:
+        print(f"Error general al leer o limpiar datos de {url}: {e}")
+        return pd.DataFrame()
+
+def _clean_fbref_table(df, stat=None):
+    """Flattens headers, drops repeated header rows, transliterates names and builds PlSqu."""
+    if stat is not None:
+        df.columns = _compile_renamer(stat.name, tuple(df.columns))
+    elif isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(0)
+    df = df[df['Player'] != 'Player'].copy() # Ensure it's a copy after filtering
+
+    if 'Matches' in df.columns:
+        df.drop(columns='Matches', inplace=True)
+
+    # Apply unidecode carefully (once per distinct name; they repeat across tables and squads)
+    if 'Player' in df.columns:
+        df.loc[:, 'Player'] = _transliterar(df['Player'])
+    if 'Squad' in df.columns:
+        df.loc[:, 'Squad'] = _transliterar(df['Squad'])
+
+    if 'Player' in df.columns and 'Squad' in df.columns:
+        # Ensure Player and Squad are strings before concatenation
+        df.loc[:, 'PlSqu'] = df['Player'].astype(str) + df['Squad'].astype(str)
+    else:
+        # Create an empty PlSqu column if Player or Squad is missing, to avoid downstream errors
+        df.loc[:, 'PlSqu'] = pd.Series(index=df.index, dtype='str')
+        print("Advertencia: Columnas 'Player' o 'Squad' no encontradas, 'PlSqu' creada vacía.")
+    if stat is not None:
+        df = _apply_ingest_schema(df, stat)
+    return df
+
+def _export_csv_to_data_folder(df, base_name, season):
+    """Exports DataFrame to a CSV file in the ./data directory."""
+    if df.empty:
+        print(f"DataFrame para '{base_name}_{season}' está vacío. No se guardará.")
+        return
+
+    output_dir = _DATA_DIR
+    os.makedirs(output_dir, exist_ok=True) # Create ./data directory if it doesn't exist
+
+    file_name = f'{base_name}_{season}.csv'
+    output_path = os.path.join(output_dir, file_name)
+
+    df.to_csv(output_path, encoding='utf-8', index=False)
+    print(f"Archivo CSV guardado en: {os.path.abspath(output_path)}")
+
+# --- Columnar Export (Parquet/Feather) ---
+_DATA_DIR = os.path.join('.', 'data')
+_DEFAULT_EXPORT_FORMATS = ('csv',)
+_CATEGORICAL_COLUMNS = ['Squad', 'Comp', 'Nation', 'Pos']
+
+def _compact_dtypes(df):
+    """Returns a copy with downcast numerics and categorical Squad/Comp/Nation/Pos."""
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if col in _CATEGORICAL_COLUMNS:
+            df[col] = series.astype('category')
+        elif pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            downcast = series.astype('float32')
+            # Keep float64 where float32 would visibly change values (e.g. market values)
+            if np.allclose(downcast.to_numpy(dtype='float64'), series.to_numpy(), rtol=1e-6, equal_nan=True):
+                df[col] = downcast
+    return df
+
+_UNSAFE_PATH_CHARS_RE = re.compile(r'[\\/:*?"<>|=]')
+
+def _partition_value(value):
+    """Makes a partition value safe to use as a directory name."""
+    return _UNSAFE_PATH_CHARS_RE.sub('_', str(value)).strip() or 'unknown'
+
+def _can_export_columnar(df, base_name, season, fmt):
+    """Checks that pyarrow is installed and column names are unique, warning otherwise."""
+    try:
+        import pyarrow # noqa: F401 -- required by both to_parquet and to_feather
+    except ImportError:
+        print(f"Advertencia: pyarrow no está instalado. No se exporta en formato {fmt}.")
+        return False
+    if df.columns.duplicated().any():
+        print(f"Advertencia: columnas duplicadas en '{base_name}_{season}'. No se exporta en formato {fmt}.")
+        return False
+    return True
+
+def _write_comp_partitions(df, season_dir, fmt, part=0):
+    """Writes df split by Comp as season_dir/comp=<Comp>/part-<part>.<fmt>."""
+    compact = _compact_dtypes(df)
+    compact.columns = [str(col) for col in compact.columns]
+    groups = compact.groupby('Comp', observed=True, sort=False) if 'Comp' in compact.columns else [('all', compact)]
+    for comp, comp_rows in groups:
+        part_dir = os.path.join(season_dir, f'comp={_partition_value(comp)}')
+        os.makedirs(part_dir, exist_ok=True)
+        output_path = os.path.join(part_dir, f'part-{part}.{fmt}')
+        comp_rows = comp_rows.reset_index(drop=True)
+        if fmt == 'parquet':
+            comp_rows.to_parquet(output_path, index=False, compression='zstd')
+        else:
+            comp_rows.to_feather(output_path, compression='zstd')
+
+def _export_partitioned(df, base_name, season, fmt):
+    """Writes df as data/<fmt>/<base_name>/season=<season>/comp=<Comp>/part-0.<fmt>."""
+    if not _can_export_columnar(df, base_name, season, fmt):
+        return
+    season_dir = os.path.join(_DATA_DIR, fmt, base_name, f'season={season}')
+    if os.path.isdir(season_dir):
+        shutil.rmtree(season_dir) # Drop stale competition partitions of a previous build
+    _write_comp_partitions(df, season_dir, fmt)
+    print(f"Archivos {fmt} guardados en: {os.path.abspath(season_dir)}")
+
+_EXPORTERS = {
+    'csv': _export_csv_to_data_folder,
+    'parquet': lambda df, base_name, season: _export_partitioned(df, base_name, season, 'parquet'),
+    'feather': lambda df, base_name, season: _export_partitioned(df, base_name, season, 'feather'),
+}
+
+def _export_merged_data(df, base_name, season, formats=None):
+    """Exports df in every requested format (csv, parquet, feather)."""
+    for fmt in formats or _DEFAULT_EXPORT_FORMATS:
+        if fmt not in _EXPORTERS:
+            print(f"Advertencia: formato de exportación desconocido '{fmt}'. Opciones: {', '.join(_EXPORTERS)}")
+            continue
+        with _span('export', format=fmt, season=season) as span:
+            span['rows_in'] = len(df)
+            _EXPORTERS[fmt](df, base_name, season)
+
+def _widen_pandas_metadata(schema):
+    """Points nullable integer columns (Int8, Int16, ...) of the pandas metadata at the unified width."""
+    pa = _optional_module('pyarrow')
+    if not schema.metadata or b'pandas' not in schema.metadata:
+        return schema
+    metadata = json.loads(schema.metadata[b'pandas'])
+    for column in metadata['columns']:
+        name = column.get('field_name')
+        if name not in schema.names or not str(column.get('numpy_type')).lstrip('U').startswith('Int'):
+            continue
+        field_type = schema.field(name).type
+        if pa.types.is_integer(field_type):
+            column['numpy_type'] = f"{'U' if pa.types.is_unsigned_integer(field_type) else ''}Int{field_type.bit_width}"
+    return schema.with_metadata({**schema.metadata, b'pandas': json.dumps(metadata).encode()})
+
+def _columnar_dataset(paths, root, fmt):
+    """Opens partition files as one pyarrow dataset with hive season=/comp= fields as dictionaries."""
+    ds = _optional_module('pyarrow.dataset')
+    if ds is None:
+        raise ImportError(f"pyarrow no está instalado. No se pueden leer archivos {fmt}.")
+    pa = _optional_module('pyarrow')
+    options = dict(format='parquet' if fmt == 'parquet' else 'ipc', partition_base_dir=root, # Feather v2 is Arrow IPC
+                   partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    dataset = ds.dataset(paths, **options)
+    schemas = [fragment.physical_schema for fragment in dataset.get_fragments()] # Reads each file footer
+    if any(not schema.equals(schemas[0]) for schema in schemas[1:]):
+        # Streaming builds downcast each partition on its own (int8 in one file, int16 in the next)
+        schema = pa.unify_schemas([dataset.schema] + schemas, promote_options='permissive')
+        schema = _widen_pandas_metadata(schema) # It still describes the first file
+        dataset = ds.dataset(paths, schema=schema, **options)
+    return dataset
+
+def read_merged_data(base_name='final_fbref_all5_merged_data', seasons=None, comps=None, columns=None, fmt='parquet'):
+    """Loads exported Parquet/Feather partitions, reading only the requested columns.
+
+    seasons and comps filter partitions by directory ('2023-2024', 'Premier League'),
+    so unselected files are never opened. The selected files are scanned as a single
+    pyarrow dataset, so Squad/Comp/Nation/Pos and the added 'season' column come back
+    as categoricals without a concat per file.
+    """
+    if fmt not in ('parquet', 'feather'):
+        raise ValueError(f"Formato no soportado para lectura: '{fmt}'")
+    root = os.path.join(_DATA_DIR, fmt, base_name)
+    wanted_seasons = None if seasons is None else {str(season) for season in seasons}
+    wanted_comps = None if comps is None else {_partition_value(comp) for comp in comps}
+    paths = []
+    for season_dir in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        if season_dir.startswith('.'): # Staging directory of a streaming build in progress
+            continue
+        season = season_dir.split('=', 1)[-1]
+        if wanted_seasons is not None and season not in wanted_seasons:
+            continue
+        for comp_dir in sorted(os.listdir(os.path.join(root, season_dir))):
+            if wanted_comps is not None and comp_dir.split('=', 1)[-1] not in wanted_comps:
+                continue
+            comp_path = os.path.join(root, season_dir, comp_dir)
+            # Streaming builds write one file per partition: part-0, part-1, ...
+            paths.extend(os.path.join(comp_path, name) for name in sorted(os.listdir(comp_path))
+                         if name.startswith('part-') and name.endswith(f'.{fmt}'))
+    if not paths:
+        return pd.DataFrame(columns=list(columns or []) + ['season'])
+    dataset = _columnar_dataset(paths, root, fmt)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name not in ('season', 'comp')]
+    return dataset.to_table(columns=list(columns) + ['season']).to_pandas()
+
+
+# --- Stat Table Registry ---
+@dataclass(frozen=True)
+class StatTable:
+    """Declarative description of one FBRef player stats page.
+
+    renames maps a (header group, column) pair to its flat name; group_suffixes appends
+    a suffix to every column of a header group; dtypes is applied right after renaming.
+    Adding a stat type means adding an entry to STAT_TABLES.
+    """
+    name: str
+    path: str # Segment of the stats URL, e.g. 'stats' or 'gca'
+    table_id: str
+    export_name: str # Used for the individual export: fbref<competition><export_name>_INDIVIDUAL
+    renames: dict = field(default_factory=dict)
+    group_suffixes: dict = field(default_factory=dict)
+    dtypes: dict = field(default_factory=dict)
+    url_template: str = _STATS_URL_TEMPLATE
+
+    def url(self, season, competition='Big5'):
+        """Builds the page URL for a season and competition slug."""
+        return _build_stats_url(self.path, season, competition, self.url_template)
+
+# Registry order is the merge order: the first table is the merge base.
+# Flat names match the ones produced by the previous per-function renaming, so outputs stay comparable.
+STAT_TABLES = {spec.name: spec for spec in [
+    StatTable('standard', 'stats', 'stats_standard', 'standard',
+              group_suffixes={'Per 90 Minutes': '_p90'}),
+    StatTable('shooting', 'shooting', 'stats_shooting', 'Shoot'),
+    StatTable('passing', 'passing', 'stats_passing', 'Passing',
+              group_suffixes={'Short': '_short', 'Medium': '_medium', 'Long': '_long'}),
+    StatTable('passing_type', 'passing_types', 'stats_passing_types', 'PassingType',
+              renames={('Corner Kicks', 'Out'): 'Out_1', ('Outcomes', 'Out'): 'Out_2'}),
+    StatTable('creation', 'gca', 'stats_gca', 'Creation',
+              group_suffixes={'SCA Types': '_SCA', 'GCA Types': '_GCA'}),
+    StatTable('defense', 'defense', 'stats_defense', 'Defense',
+              renames={('Tackles', 'Tkl'): 'Tkl_tackles', ('Challenges', 'Tkl'): 'Tkl_challenges',
+                       ('Vs Dribbles', 'Tkl'): 'Tkl_challenges', # Older seasons' name for 'Challenges'
+                       ('Tackles', 'Def 3rd'): 'Def 3rd_1', ('Tackles', 'Mid 3rd'): 'Mid 3rd_1', ('Tackles', 'Att 3rd'): 'Att 3rd_1',
+                       ('Pressures', 'Def 3rd'): 'Def 3rd_2', ('Pressures', 'Mid 3rd'): 'Mid 3rd_2', ('Pressures', 'Att 3rd'): 'Att 3rd_2'}),
+    StatTable('possession', 'possession', 'stats_possession', 'Possession',
+              renames={('Carries', 'Prog'): 'Prog_2', ('Receiving', 'Prog'): 'Prog_3'}),
+    StatTable('playing_time', 'playingtime', 'stats_playing_time', 'PlayingTime',
+              renames={('Team Success', 'On-Off'): 'On-Off_1', ('Team Success (xG)', 'On-Off'): 'On-Off_2'}),
+]}
+
+@lru_cache(maxsize=256)
+def _compile_renamer(stat_name, columns):
+    """Resolves the flat names for one header layout of a stat table (cached per layout)."""
+    spec = STAT_TABLES[stat_name]
+    flat = []
+    for column in columns:
+        group, name = column if isinstance(column, tuple) else ('', column)
+        group = '' if str(group).startswith('Unnamed:') else group # read_html's name for an empty group
+        renamed = spec.renames.get((group, name))
+        if renamed is None:
+            renamed = f'{name}{spec.group_suffixes[group]}' if group in spec.group_suffixes else name
+        flat.append(renamed)
+    return flat
+
+def _cast_column(series, dtype):
+    """Casts one column to a schema dtype, coercing bad cells to NaN."""
+    if dtype == 'category' or dtype in ('string', 'object'):
+        return series.astype(dtype)
+    return pd.to_numeric(series, errors='coerce').astype(dtype)
+
+# Typed at ingest so the merge moves compact blocks instead of object columns.
+# Columns not listed here are parsed as stats by _compact_numeric.
+_INGEST_DTYPES = {'Pos': 'category', 'Squad': 'category', 'Comp': 'category', 'Nation': 'category', 'Born': 'Int16'}
+_INGEST_TEXT_COLUMNS = ['Player', 'PlSqu', 'Age']
+_memory_records = deque(maxlen=_MAX_RECORDS)
+_memory_records_lock = threading.Lock()
+
+def _compact_numeric(series):
+    """Parses a stat column as Int16/Int32 when every value is integral, float32 otherwise."""
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.dropna()
+    if len(present) and (present % 1 == 0).all():
+        largest = present.abs().max()
+        if largest < 2 ** 15:
+            return values.astype('Int16')
+        if largest < 2 ** 31:
+            return values.astype('Int32')
+    return values.astype('float32')
+
+def _apply_ingest_schema(df, stat):
+    """Types a freshly fetched table (StatTable.dtypes over the common schema) and records its memory."""
+    bytes_before = df.memory_usage(deep=True, index=False)
+    dtypes_before = df.dtypes.astype(str)
+    schema = {**_INGEST_DTYPES, **stat.dtypes}
+    # Built into a dict and turned into a frame once: assigning column by column leaves
+    # one block per column, which every later insert (player_code, ...) warns about.
+    columns = {}
+    for col, values in df.items():
+        if col in schema:
+            columns[col] = _cast_column(values, schema[col])
+        elif col in _INGEST_TEXT_COLUMNS:
+            columns[col] = values
+        else:
+            columns[col] = _compact_numeric(values)
+    if 'Age' in df.columns:
+        columns['DecimalAge'] = _edades_a_decimal(df['Age']).astype('float32')
+    df = pd.DataFrame(columns, index=df.index)
+
+    bytes_after = df.memory_usage(deep=True, index=False)
+    with _memory_records_lock:
+        for col in df.columns:
+            _memory_records.append({
+                'stat': stat.name, 'column': col,
+                'dtype_before': dtypes_before.get(col, ''), 'bytes_before': int(bytes_before.get(col, 0)),
+                'dtype_after': str(df[col].dtype), 'bytes_after': int(bytes_after[col]),
+            })
+    return df
+
+def get_memory_report(reset=False):
+    """Returns bytes per column before/after the ingest schema for every table fetched so far."""
+    with _memory_records_lock:
+        report = pd.DataFrame(list(_memory_records), columns=['stat', 'column', 'dtype_before', 'bytes_before', 'dtype_after', 'bytes_after'])
+        if reset:
+            _memory_records.clear()
+    return report
+
+def _write_memory_report(name):
+    """Writes the memory report to data/memory_report_<name>.csv and prints the totals."""
+    report = get_memory_report(reset=True)
+    if report.empty:
+        return
+    summary = report.groupby('stat', sort=False)[['bytes_before', 'bytes_after']].sum()
+    os.makedirs(_DATA_DIR, exist_ok=True)
+    output_path = os.path.join(_DATA_DIR, f'memory_report_{name}.csv')
+    report.to_csv(output_path, encoding='utf-8', index=False)
+    before, after = summary['bytes_before'].sum(), summary['bytes_after'].sum()
+    print(f"Memoria de las tablas: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({after / max(before, 1):.0%}). Detalle en {os.path.abspath(output_path)}")
+
+def fetch_stat_table(stat, start_year=None, export_format=None, return_df=False, competition='Big5'):
+    """Fetches, renames and types one registered stat table for a season and competition."""
+    spec = STAT_TABLES[stat]
+    season = _get_season_string(start_year)
+    with _span('stat', stat=stat, season=season, competition=competition) as span:
+        df = _fetch_and_clean_fbref_table(spec.url(season, competition), table_id=spec.table_id, stat=spec)
+        span['rows_out'] = len(df)
+    if df.empty: return pd.DataFrame() if return_df else None # Return empty DF if needed
+    if export_format and not return_df: _export_csv_to_data_folder(df, f'fbref{competition}{spec.export_name}_INDIVIDUAL', season)
+    return df if return_df else None
+
+def _make_stat_function(stat):
+    """Builds the public <stat>_stats(start_year, export_format, return_df, competition) wrapper."""
+    def stat_function(start_year=None, export_format=None, return_df=False, competition='Big5'):
+        return fetch_stat_table(stat, start_year=start_year, export_format=export_format, return_df=return_df, competition=competition)
+    stat_function.__name__ = stat_function.__qualname__ = f'{stat}_stats'
+    stat_function.__doc__ = f"Fetches the FBRef '{stat}' player stats table."
+    return stat_function
+
+standard_stats = _make_stat_function('standard')
+shooting_stats = _make_stat_function('shooting')
+passing_stats = _make_stat_function('passing')
+passing_type_stats = _make_stat_function('passing_type')
+creation_stats = _make_stat_function('creation')
+defense_stats = _make_stat_function('defense')
+possession_stats = _make_stat_function('possession')
+playing_time_stats = _make_stat_function('playing_time')
+
+# --- Function to Scrape All Stats ---
+def scrape_all_stats_for_merge(start_year=None, competition='Big5'):
+    return [df for _, df in _scrape_named_stats(start_year, competition)]
+
+def _scrape_named_stats(start_year=None, competition='Big5'):
+    """Fetches every stat table concurrently; returns [(stat function name, df)] in merge order."""
+    season_str = _get_season_string(start_year)
+    print(f"Iniciando scraping para la temporada: {season_str} - {competition} (para merge)")
+
+    # Requests are spaced by the per-host token bucket in _http_get instead of fixed sleeps,
+    # so the pages are fetched concurrently and cached pages do not wait at all.
+    with _span('scrape', season=season_str, competition=competition) as span, ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as executor:
+        futures = []
+        for stat in STAT_TABLES:
+            print(f"Obteniendo datos de: {stat}_stats...")
+            # Call with return_df=True to get DataFrame, export_format=None (or default) to bypass individual export
+            futures.append((f'{stat}_stats', executor.submit(fetch_stat_table, stat, start_year=start_year, return_df=True, competition=competition)))
+
+        dfs_list = []
+        for func_name, future in futures: # Keep the registry order; the first table is the merge base
+            df = future.result()
+            if df is not None and not df.empty:
+                dfs_list.append((func_name, df))
+                print(f"Datos de {func_name} obtenidos. {df.shape[0]} filas, {df.shape[1]} columnas.")
+            else:
+                print(f"Advertencia: {func_name} devolvió un DataFrame vacío o None para {season_str}.")
+        span['rows_out'] = sum(len(df) for _, df in dfs_list)
+    return dfs_list
+
+# --- Multi-Way Join ---
+def _multiway_inner_join(dfs, key='PlSqu'):
+    """Inner-joins dfs on key in a single pass. Returns (merged DataFrame, dropped keys).
+
+    Gives the same rows and columns as chaining pd.merge(..., on=key, how='inner') from
+    left to right, where each frame only adds the columns earlier frames did not have.
+    The key is factorized once into integer codes, every frame is aligned to the base
+    rows through those codes and the result is allocated by one concat, instead of
+    copying the growing frame and rehashing the string key on every merge.
+    """
+    base = dfs[0]
+    seen_cols = set(base.columns)
+    parts = []
+    for i, df_to_add in enumerate(dfs[1:], start=2):
+        if key not in df_to_add.columns or key not in base.columns:
+            print(f"Advertencia: El DataFrame {i} no contiene '{key}' o el DF base no lo tiene; fue omitido del merge.")
+            continue
+        # Only the new columns are kept; dict.fromkeys also drops repeated column labels
+        new_cols = list(dict.fromkeys(col for col in df_to_add.columns if col not in seen_cols and col != key))
+        if not new_cols:
+            print(f"Advertencia: El DataFrame {i} no tenía nuevas columnas (además de {key}) y fue omitido del merge.")
+            continue
+        seen_cols.update(new_cols)
+        parts.append((i, df_to_add, new_cols))
+    if not parts:
+        return base.copy(), pd.Index([])
+
+    frames = [base] + [df for _, df, _ in parts]
+    codes, uniques = pd.factorize(pd.concat([df[key] for df in frames], ignore_index=True))
+    n_keys = len(uniques)
+    bounds = np.cumsum([0] + [len(df) for df in frames])
+    frame_codes = [codes[bounds[j]:bounds[j + 1]] for j in range(len(frames))]
+
+    if any(len(np.unique(c)) != len(c) for c in frame_codes):
+        # Repeated keys multiply rows under inner-join semantics; let pd.merge handle that case.
+        merged = base
+        for _, df_to_add, new_cols in parts:
+            merged = pd.merge(merged, df_to_add[[key] + new_cols], on=key, how='inner')
+        return merged, pd.Index(uniques).difference(merged[key].unique())
+
+    base_codes = frame_codes[0]
+    keep = np.ones(len(base), dtype=bool)
+    positions = []
+    for (i, _, _), codes_j in zip(parts, frame_codes[1:]):
+        lookup = np.full(n_keys + 1, -1, dtype=np.intp) # Last slot serves the -1 code of a missing key
+        lookup[codes_j] = np.arange(len(codes_j))
+        pos = lookup[base_codes]
+        missing = int((pos < 0).sum())
+        if missing:
+            print(f"Merge: {missing} filas del DF base no están en el DataFrame {i}.")
+        keep &= pos >= 0
+        positions.append(pos)
+
+    rows = np.flatnonzero(keep)
+    blocks = [base.iloc[rows].reset_index(drop=True)]
+    for (_, df_to_add, new_cols), pos in zip(parts, positions):
+        blocks.append(df_to_add[new_cols].iloc[pos[rows]].reset_index(drop=True))
+    merged = pd.concat(blocks, axis=1, copy=False)
+
+    in_result = np.zeros(n_keys + 1, dtype=bool)
+    in_result[base_codes[rows]] = True
+    return merged, pd.Index(uniques[~in_result[:n_keys]])
+
+# --- Local Player Master Store ---
+_MAESTRO_DB = os.path.join('.', 'cache', 'players.sqlite')
+_MAESTRO_LOOKUP_CHUNK = 900 # Stays below SQLite's default limit of bound parameters
+_MAESTRO_STORE_VERSION = 2 # Bump when the stored columns change so existing stores rebuild
+_MAESTRO_IDENTITY_COLUMNS = ['name', 'date_of_birth', 'country_of_citizenship'] # Used by identity matching
+columnas_maestro_seleccionadas = [
+    'player_code_maestro', 'sub_position', 'current_club_name',
+    'market_value_in_eur', 'last_season',
+    'foot', 'height_in_cm', 'contract_expiration_date'
+]
+
+def _connect_maestro_store(db_path=None):
+    """Opens the SQLite store (autocommit; transactions are explicit)."""
+    db_path = db_path or _MAESTRO_DB
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    con = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    con.execute('CREATE TABLE IF NOT EXISTS maestro_meta (key TEXT PRIMARY KEY, value TEXT)')
+    return con
+
+def _refresh_maestro_store(db_path=None):
+    """Syncs the local maestro table with players.csv, rebuilding it only if the CSV changed.
+
+    The download goes through the HTTP cache, so an unchanged remote file costs a
+    conditional request (ETag/Last-Modified) at most. Only the selected columns are
+    kept, keyed and uniquely indexed on the normalized player code.
+    """
+    body = _cached_get(_MAESTRO_URL)
+    digest = f'{hashlib.sha256(body).hexdigest()}:v{_MAESTRO_STORE_VERSION}'
+    con = _connect_maestro_store(db_path)
+    try:
+        row = con.execute("SELECT value FROM maestro_meta WHERE key = 'source_sha256'").fetchone()
+        if row and row[0] == digest:
+            return False
+
+        header = pd.read_csv(io.BytesIO(body), nrows=0).columns
+        if 'name' in header:
+            key_col = 'name'
+        elif 'player_code' in header: # If 'player_code' exists, use it as the key
+            key_col = 'player_code'
+        else:
+            print("Error crítico: 'players.csv' no tiene 'name' ni 'player_code'.")
+            raise KeyError("Falta la columna clave ('name' o 'player_code') en players.csv para el merge.")
+        value_cols = [col for col in columnas_maestro_seleccionadas[1:] + _MAESTRO_IDENTITY_COLUMNS if col in header]
+        df_maestro = pd.read_csv(io.BytesIO(body), usecols=list(dict.fromkeys([key_col] + value_cols)))
+        keys = _generar_player_codes(df_maestro[key_col]) if key_col == 'name' else df_maestro[key_col]
+        df_maestro = df_maestro[value_cols].assign(player_code_maestro=keys)[['player_code_maestro'] + value_cols]
+        df_maestro = df_maestro.dropna(subset=['player_code_maestro']).drop_duplicates(subset=['player_code_maestro'], keep='first')
+
+        rows = df_maestro.astype(object).where(df_maestro.notna(), None).itertuples(index=False, name=None)
+        quoted = ', '.join(f'"{col}"' for col in df_maestro.columns)
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            con.execute('DROP TABLE IF EXISTS maestro')
+            con.execute(f'CREATE TABLE maestro ({quoted})')
+            con.executemany(f'INSERT INTO maestro VALUES ({", ".join("?" * len(df_maestro.columns))})', rows)
+            con.execute('CREATE UNIQUE INDEX idx_maestro_code ON maestro (player_code_maestro)')
+            con.execute("INSERT OR REPLACE INTO maestro_meta VALUES ('source_sha256', ?)", (digest,))
+            con.execute('COMMIT')
+        except Exception:
+            con.execute('ROLLBACK')
+            raise
+        print(f"Maestro local actualizado: {len(df_maestro)} jugadores.")
+        return True
+    finally:
+        con.close()
+
+def _maestro_store_exists(db_path=None):
+    """True if the local store holds a maestro table from an earlier refresh."""
+    db_path = db_path or _MAESTRO_DB
+    if not os.path.exists(db_path):
+        return False
+    con = _connect_maestro_store(db_path)
+    try:
+        return con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'maestro'").fetchone() is not None
+    finally:
+        con.close()
+
+def _lookup_maestro(player_codes, columns=None, db_path=None):
+    """Returns the maestro rows for player_codes through the indexed key, one row per code."""
+    con = _connect_maestro_store(db_path)
+    try:
+        stored = [row[1] for row in con.execute('PRAGMA table_info(maestro)')]
+        wanted = columns or columnas_maestro_seleccionadas
+        selected = ['player_code_maestro'] + [col for col in wanted if col in stored and col != 'player_code_maestro']
+        codes = pd.Series(player_codes).dropna().unique().tolist()
+        quoted = ', '.join(f'"{col}"' for col in selected)
+        chunks = []
+        for start in range(0, len(codes), _MAESTRO_LOOKUP_CHUNK):
+            chunk = codes[start:start + _MAESTRO_LOOKUP_CHUNK]
+            query = f'SELECT {quoted} FROM maestro WHERE player_code_maestro IN ({", ".join("?" * len(chunk))})'
+            chunks.append(pd.read_sql_query(query, con, params=chunk))
+    finally:
+        con.close()
+    if not chunks:
+        return pd.DataFrame(columns=selected)
+    return pd.concat(chunks, ignore_index=True)
+
+# --- Player Identity Resolution ---
+_IDENTITY_MIN_SCORE = 0.92 # Jaro-Winkler similarity needed to accept a fuzzy match
+_IDENTITY_MIN_MARGIN = 0.02 # Best candidate must beat the runner-up by this much, else it is ambiguous
+_IDENTITY_NATION_BONUS = 0.02
+
+def _jaro_winkler(a, b, prefix_scale=0.1):
+    """Jaro-Winkler similarity between two strings (1.0 = identical)."""
+    if a == b:
+        return 1.0
+    len_a, len_b = len(a), len(b)
+    if not len_a or not len_b:
+        return 0.0
+    window = max(max(len_a, len_b) // 2 - 1, 0)
+    matched_b = [False] * len_b
+    matches_a = []
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len_b, i + window + 1)):
+            if not matched_b[j] and b[j] == ch:
+                matched_b[j] = True
+                matches_a.append(ch)
+                break
+    m = len(matches_a)
+    if not m:
+        return 0.0
+    matches_b = [b[j] for j in range(len_b) if matched_b[j]]
+    transpositions = sum(x != y for x, y in zip(matches_a, matches_b)) / 2
+    jaro = (m / len_a + m / len_b + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+def _name_similarity(code_a, code_b):
+    """Similarity of two player codes, tolerant to reordered names ('son-heung-min' / 'heung-min-son')."""
+    direct = _jaro_winkler(code_a, code_b)
+    if direct == 1.0:
+        return direct
+    reordered = _jaro_winkler('-'.join(sorted(code_a.split('-'))), '-'.join(sorted(code_b.split('-'))))
+    return max(direct, reordered)
+
+def _blocking_keys(codes, groups):
+    """Explodes codes into (name token, group) blocking keys; tokens shorter than 3 chars are ignored."""
+    tokens = pd.Series(codes).str.split('-').explode()
+    tokens = tokens[tokens.str.len() >= 3]
+    return tokens + '|' + pd.Series(groups).astype(str).reindex(tokens.index)
+
+def _create_identity_map(con):
+    """Creates the table of accepted fuzzy matches, keyed on the FBRef code and birth year."""
+    con.execute('CREATE TABLE IF NOT EXISTS identity_map '
+                '(fbref_code TEXT, born INTEGER, maestro_code TEXT, score REAL, PRIMARY KEY (fbref_code, born))')
+
+@dataclass(frozen=True)
+class _MaestroCandidates:
+    """Fuzzy-match candidates of the maestro store, blocked once and shared by every
+    partition of a season. blocks is None when the store lacks the identity columns."""
+    stored: bool
+    codes: pd.Series = None
+    nations: pd.Series = None
+    blocks: dict = None
+
+
+def _load_maestro_candidates(db_path=None):
+    """Reads the maestro candidates and blocks them on name token plus birth year and nationality."""
+    if not _maestro_store_exists(db_path):
+        return _MaestroCandidates(stored=False)
+    con = _connect_maestro_store(db_path)
+    try:
+        stored = [row[1] for row in con.execute('PRAGMA table_info(maestro)')]
+        if not all(col in stored for col in _MAESTRO_IDENTITY_COLUMNS):
+            return _MaestroCandidates(stored=True)
+        candidates = pd.read_sql_query(
+            'SELECT player_code_maestro, date_of_birth, country_of_citizenship FROM maestro', con)
+    finally:
+        con.close()
+    cand_year = pd.to_numeric(candidates['date_of_birth'].astype(str).str[:4], errors='coerce').fillna(-1).astype(int)
+    cand_codes = candidates['player_code_maestro'].astype(str)
+    cand_nation = candidates['country_of_citizenship'].astype(str)
+    blocks = {}
+    for keys in (_blocking_keys(cand_codes, cand_year), _blocking_keys(cand_codes, cand_nation)):
+        for position, key in zip(keys.index, keys.to_numpy()):
+            blocks.setdefault(key, set()).add(position)
+    return _MaestroCandidates(stored=True, codes=cand_codes, nations=cand_nation, blocks=blocks)
+
+
+def _prepare_maestro_join(db_path=None):
+    """Refreshes the maestro store and blocks its candidates, once for all the partitions of a season."""
+    try:
+        _refresh_maestro_store(db_path)
+    except Exception as e: # Offline or players.csv unreachable: the stored copy is still good to join
+        print(f"Advertencia: no se pudo actualizar el maestro local: {e}")
+    return _load_maestro_candidates(db_path)
+
+
+def _resolve_player_identities(df, db_path=None, candidates=None):
+    """Returns, aligned with df, the maestro code each FBRef player joins on.
+
+    Exact slug matches are used as they are. The remaining players are matched by
+    blocking maestro candidates on a name token plus birth year (or nationality when
+    the year is missing) and scoring only inside those blocks, so the cost grows with
+    block sizes instead of FBRef x maestro. Accepted fuzzy matches are persisted in the
+    store's identity_map table and reused on later runs. candidates, from
+    _prepare_maestro_join, skips re-reading the store; otherwise it is loaded on demand.
+    """
+    codes = df['player_code']
+    born = pd.to_numeric(df['Born'], errors='coerce') if 'Born' in df.columns else pd.Series(np.nan, index=df.index)
+    nation = df['Nation'].astype(str) if 'Nation' in df.columns else pd.Series('', index=df.index)
+    resolved = pd.Series(None, index=df.index, dtype=object)
+
+    exact_codes = set(_lookup_maestro(codes, columns=['player_code_maestro'], db_path=db_path)['player_code_maestro'])
+    exact = codes.isin(exact_codes)
+    resolved[exact] = codes[exact]
+    report = {'players': int(codes.notna().sum()), 'exact': int(exact.sum()), 'cached': 0, 'fuzzy': 0, 'ambiguous': 0, 'unmatched': 0}
+
+    pending = df.index[~exact & codes.notna()]
+    born_key = born.fillna(-1).astype(int)
+    con = _connect_maestro_store(db_path)
+    try:
+        _create_identity_map(con)
+        cached = {(code, year): maestro_code for code, year, maestro_code in con.execute('SELECT fbref_code, born, maestro_code FROM identity_map')}
+        for idx in pending:
+            hit = cached.get((codes[idx], born_key[idx]))
+            if hit is not None:
+                resolved[idx] = hit
+                report['cached'] += 1
+        pending = [idx for idx in pending if pd.isna(resolved[idx])] # Assigning codes turned the empty slots into NaN
+
+        new_matches = []
+        if pending:
+            if candidates is None:
+                candidates = _load_maestro_candidates(db_path)
+            if candidates.blocks is not None:
+                cand_codes, cand_nation, blocks = candidates.codes, candidates.nations, candidates.blocks
+                for idx in pending:
+                    code = codes[idx]
+                    group = born_key[idx] if born_key[idx] >= 0 else nation[idx]
+                    block = set()
+                    for key in _blocking_keys([code], [group]):
+                        block |= blocks.get(key, set())
+                    scored = sorted(
+                        ((_name_similarity(code, cand_codes[pos]) + (_IDENTITY_NATION_BONUS if cand_nation[pos] == nation[idx] else 0.0), pos)
+                         for pos in block),
+                        reverse=True,
+                    )
+                    if not scored or scored[0][0] < _IDENTITY_MIN_SCORE:
+                        report['unmatched'] += 1
+                    elif len(scored) > 1 and scored[0][0] - scored[1][0] < _IDENTITY_MIN_MARGIN and cand_codes[scored[0][1]] != cand_codes[scored[1][1]]:
+                        report['ambiguous'] += 1
+                    else:
+                        resolved[idx] = cand_codes[scored[0][1]]
+                        new_matches.append((code, int(born_key[idx]), resolved[idx], float(scored[0][0])))
+                        report['fuzzy'] += 1
+            else:
+                print("Advertencia: el maestro local no tiene columnas de identidad; sin emparejamiento aproximado.")
+                report['unmatched'] += len(pending)
+        if new_matches:
+            con.executemany('INSERT OR REPLACE INTO identity_map VALUES (?, ?, ?, ?)', new_matches)
+    finally:
+        con.close()
+
+    matched = report['exact'] + report['cached'] + report['fuzzy']
+    report['match_rate'] = matched / report['players'] if report['players'] else 0.0
+    print(f"Identidades: {report['exact']} exactas, {report['cached']} reutilizadas, {report['fuzzy']} aproximadas, "
+          f"{report['ambiguous']} ambiguas, {report['unmatched']} sin cruce ({report['match_rate']:.1%} cruzados).")
+    return resolved, report
+
+# --- MERGER FUNCTION (Modified) ---
+def merger_5leagues(start_year=None, competition='Big5', formats=None, incremental=False, memory_report=False,
+                    streaming=False, partition_by='hash', partitions=None): # Removed export_format and return_df
+    season_str = _get_season_string(start_year)
+    print(f"Iniciando merge para la temporada: {season_str} - {competition}")
+
+    with _span('season', season=season_str, competition=competition):
+        if streaming:
+            _merge_and_export_streaming(start_year, competition, formats, partition_by, partitions)
+        elif incremental:
+            named_dfs = _scrape_named_stats(start_year=start_year, competition=competition)
+            _merge_and_export_incremental(named_dfs, season_str, competition, formats)
+        else:
+            all_dfs = scrape_all_stats_for_merge(start_year=start_year, competition=competition)
+            _merge_and_export_season(all_dfs, season_str, competition, formats)
+    if memory_report:
+        _write_memory_report(f'{competition}_{season_str}')
+    else:
+        get_memory_report(reset=True)
+    # No return value needed as the script's purpose is to save the file.
+
+def _merge_and_export_season(all_dfs, season_str, competition='Big5', formats=None):
+    """Merges, cleans and exports one season. Top-level so it can run in a process pool."""
+    final_merged_df = _merge_and_clean_season(all_dfs, season_str)
+    if final_merged_df is None:
+        return None
+    # Always export the final merged DataFrame (CSV by default, plus any columnar formats)
+    _export_merged_data(final_merged_df, _merged_output_name(competition), season_str, formats)
+    return final_merged_df.shape
+
+def _merge_and_clean_season(all_dfs, season_str, maestro=None):
+    """Merges the stat tables on PlSqu, cleans them and joins the players.csv maestro.
+
+    maestro is passed through to _join_maestro (see _prepare_maestro_join).
+    """
+    if not all_dfs:
+        print(f"No se obtuvieron datos de ninguna tabla para {season_str}. No se puede mergear.")
+        return None # Exit if no data
+
+    final_merged_df = pd.DataFrame()
+    initial_df_found = False
+    temp_all_dfs = list(all_dfs) # Create a mutable copy
+
+    for i, df_iter in enumerate(all_dfs):
+        if not df_iter.empty:
+            final_merged_df = df_iter.copy() # Use a copy
+            initial_df_found = True
+            temp_all_dfs = all_dfs[i+1:] # Slice the original list for remaining DFs
+            print(f"DataFrame inicial para merge tomado de {i+1}ª función. Forma: {final_merged_df.shape}")
+            break
+    
+    if not initial_df_found:
+        print(f"Todos los DataFrames obtenidos están vacíos para {season_str}. No se puede mergear.")
+        return None
+
+    with _span('merge', season=season_str) as span:
+        tables = [final_merged_df] + [df for df in temp_all_dfs if not df.empty]
+        span['rows_in'] = sum(len(df) for df in tables)
+        final_merged_df, dropped_keys = _multiway_inner_join(tables)
+        span['rows_out'] = len(final_merged_df)
+    if len(dropped_keys):
+        print(f"{len(dropped_keys)} claves PlSqu descartadas por el inner join (no presentes en todas las tablas), "
+              f"p. ej.: {', '.join(map(str, dropped_keys[:5]))}")
+
+    if final_merged_df.empty:
+        print(f"El DataFrame fusionado (antes de maestro) está vacío para {season_str}.")
+    else:
+        print(f"DataFrame fusionado (antes de maestro) tiene {final_merged_df.shape[0]} filas, {final_merged_df.shape[1]} columnas.")
+        with _span('clean_merged', season=season_str) as span:
+            span['rows_in'] = len(final_merged_df)
+            final_merged_df = _clean_merged_columns(final_merged_df)
+            span['rows_out'] = len(final_merged_df)
+        with _span('maestro_join', season=season_str) as span:
+            span['rows_in'] = len(final_merged_df)
+            final_merged_df = _join_maestro(final_merged_df, maestro)
+            span['rows_out'] = len(final_merged_df)
+    with _span('numeric', season=season_str) as span:
+        span['rows_in'] = len(final_merged_df)
+        final_merged_df = _convert_remaining_numeric(final_merged_df)
+        span['rows_out'] = len(final_merged_df)
+    return final_merged_df
+
+def _clean_merged_columns(final_merged_df):
+    """Maps Nation codes to country names, strips the Comp prefix and ensures DecimalAge."""
+    # Nation mapping, Comp cleaning, Age to Decimal (preserved from original)
+    # Nation and Comp are categorical since ingest, so each rule runs once per distinct value
+    if 'Nation' in final_merged_df.columns:
+        def _nation_name(value):
+            match = _NATION_CODE_RE.match(str(value))
+            return _NATION_NAMES.get(match.group(1).lower(), value) if match else value
+        final_merged_df['Nation'] = _map_unique(final_merged_df['Nation'], _nation_name, null_value=np.nan).astype('category')
+
+    if 'Comp' in final_merged_df.columns:
+        def _comp_name(value):
+            match = _COMP_NAME_RE.match(str(value))
+            return match.group(1) if match else value
+        final_merged_df['Comp'] = _map_unique(final_merged_df['Comp'], _comp_name, null_value=np.nan).astype('category')
+
+    if 'DecimalAge' in final_merged_df.columns:
+        # Parsed at ingest; moved to the end, where the post-merge parse used to add it.
+        # A column take keeps the blocks whole (pop would split the float32 block).
+        order = [col for col in final_merged_df.columns if col != 'DecimalAge'] + ['DecimalAge']
+        final_merged_df = final_merged_df[order]
+    elif 'Age' in final_merged_df.columns:
+        final_merged_df.loc[:, 'DecimalAge'] = _edades_a_decimal(final_merged_df['Age'])
+    else: print("Advertencia: Columna 'Age' no encontrada para DecimalAge.")
+    return final_merged_df
+
+def _join_maestro(final_merged_df, maestro=None):
+    """Left-joins the maestro columns through the local store and identity resolution.
+
+    maestro, from _prepare_maestro_join, means the store was already refreshed for this season.
+    """
+    print("Intentando merge con players.csv (maestro)...")
+    try:
+        if 'Player' in final_merged_df.columns:
+            final_merged_df.loc[:, 'player_code'] = _generar_player_codes(final_merged_df['Player'])
+        else:
+            print("Advertencia: 'Player' no en final_merged_df. No se puede generar 'player_code'.")
+            final_merged_df.loc[:, 'player_code'] = pd.Series(dtype='object') # Create empty if not present
+
+        # Local indexed store: only the codes of this season are looked up
+        if maestro is None:
+            try:
+                with _span('maestro_refresh'):
+                    _refresh_maestro_store()
+            except Exception as e: # Offline or players.csv unreachable: the stored copy is still good to join
+                print(f"Advertencia: no se pudo actualizar el maestro local: {e}")
+        if not (maestro.stored if maestro is not None else _maestro_store_exists()):
+            print("Error: no hay maestro local ni se pudo descargar players.csv. Se omite el cruce con maestro.")
+        elif 'player_code' in final_merged_df.columns:
+            # Exact slugs first, then blocked fuzzy matches for the name variants that miss
+            maestro_keys, _ = _resolve_player_identities(final_merged_df, candidates=maestro)
+            final_merged_df['_maestro_key'] = maestro_keys.to_numpy()
+            df_maestro_filtrado = _lookup_maestro(final_merged_df['_maestro_key'])
+            columnas_maestro_existentes = list(df_maestro_filtrado.columns)
+
+            if 'player_code_maestro' not in columnas_maestro_existentes:
+                 print("Error Crítico: 'player_code_maestro' no está en las columnas del maestro para el cruce.")
+            else:
+                final_merged_df = final_merged_df.merge(
+                    df_maestro_filtrado,
+                    left_on='_maestro_key',
+                    right_on='player_code_maestro',
+                    how='left',
+                    suffixes=('', '_maestro') # Simpler suffix
+                )
+                if 'player_code_maestro' in final_merged_df.columns: # Drop the redundant key from maestro
+                    final_merged_df.drop(columns=['player_code_maestro'], inplace=True)
+
+                # Consolidate columns if suffixes were applied by merge due to existing col names
+                for col_base in [c for c in columnas_maestro_existentes if c != 'player_code_maestro']:
+                    col_maestro_suffixed = col_base + '_maestro'
+                    if col_maestro_suffixed in final_merged_df.columns:
+                        # Prioritize maestro's data if it exists, otherwise keep original
+                        final_merged_df[col_base] = final_merged_df[col_maestro_suffixed].fillna(final_merged_df.get(col_base))
+                        final_merged_df.drop(columns=[col_maestro_suffixed], inplace=True)
+                print("Cruce con archivo maestro realizado.")
+        else:
+            print("Error: 'player_code' no disponible para el cruce con maestro.")
+
+    except FileNotFoundError:
+        print("Error: players.csv no encontrado en la URL.")
+    except KeyError as ke:
+        print(f"Error: columna faltante durante el merge con maestro: {ke}")
+    except Exception as e:
+        print(f"Error inesperado durante el merge con maestro: {e}")
+    final_merged_df = final_merged_df.drop(columns=['_maestro_key'], errors='ignore')
+    return final_merged_df
+
+def _convert_remaining_numeric(final_merged_df):
+    """Converts the text columns still left after the merge (e.g. from the maestro) to numbers."""
+    if not final_merged_df.empty:
+        # Stat columns are typed at ingest; only text columns left over (e.g. from the maestro) are converted here
+        print("Convirtiendo columnas a formato numérico adecuado...")
+        exclude_cols = [
+            'Player', 'Nation', 'Pos', 'Squad', 'Comp', 'Born', 'foot',
+            'contract_expiration_date', 'player_code', 'sub_position', 'current_club_name',
+            'PlSqu', 'Age'
+        ]
+        for col in final_merged_df.select_dtypes(include=['object', 'string']).columns:
+            if col not in exclude_cols:
+                final_merged_df[col] = pd.to_numeric(final_merged_df[col], errors='coerce')
+        print("Conversión a numérico completada.")
+    else:
+        print("DataFrame final vacío, no se realiza conversión numérica.")
+    return final_merged_df
+
+# --- Incremental Updates ---
+def _snapshot_dir():
+    """data/snapshots, under the _DATA_DIR in effect when called."""
+    return os.path.join(_DATA_DIR, 'snapshots')
+
+def _changelog_dir():
+    """data/changelog, under the _DATA_DIR in effect when called."""
+    return os.path.join(_DATA_DIR, 'changelog')
+
+_COLUMNS_SNAPSHOT_KEY = '__columns__' # Snapshot row holding the hash of a table's column names
+_MAESTRO_SNAPSHOT_KEY = '__maestro__' # Snapshot row holding the hash of the maestro state joined into the output
+
+def _stat_snapshot(named_dfs):
+    """Returns one row per (stat, PlSqu) with a hash of that row's content."""
+    snapshots = []
+    for name, df in named_dfs:
+        values = df.drop(columns=['PlSqu']).astype(str) # Hash the text form so dtype drift is not a change
+        row_hashes = pd.util.hash_pandas_object(values, index=False).astype(str)
+        columns_hash = hashlib.sha256('\x1f'.join(map(str, df.columns)).encode('utf-8')).hexdigest()
+        snapshots.append(pd.DataFrame({'stat': name, 'PlSqu': df['PlSqu'].astype(str).to_numpy(), 'row_hash': row_hashes.to_numpy()}))
+        snapshots.append(pd.DataFrame({'stat': [name], 'PlSqu': [_COLUMNS_SNAPSHOT_KEY], 'row_hash': [columns_hash]}))
+    return pd.concat(snapshots, ignore_index=True)
+
+def _season_identity_map(named_dfs, db_path=None):
+    """The identity_map rows (fbref_code, born, maestro_code, score) of this season's players, sorted."""
+    names = pd.concat([df['Player'] for _, df in named_dfs if 'Player' in df.columns] or [pd.Series(dtype=object)], ignore_index=True)
+    season_codes = set(_generar_player_codes(names.drop_duplicates()).dropna())
+    con = _connect_maestro_store(db_path)
+    try:
+        _create_identity_map(con)
+        mapped = con.execute('SELECT fbref_code, born, maestro_code, score FROM identity_map').fetchall()
+    finally:
+        con.close()
+    return sorted(list(entry) for entry in mapped if entry[0] in season_codes)
+
+def _restore_identity_map(identity_path, db_path=None):
+    """Loads the matches saved next to the snapshot into a store that lacks them (e.g. a cold CI cache).
+
+    Matches the store already holds win, so a decision changed locally still shows up
+    as a maestro change.
+    """
+    try:
+        with open(identity_path, 'r', encoding='utf-8') as fh:
+            rows = [tuple(row) for row in json.load(fh)]
+    except (OSError, ValueError, TypeError):
+        return
+    con = _connect_maestro_store(db_path)
+    try:
+        _create_identity_map(con)
+        con.executemany('INSERT OR IGNORE INTO identity_map VALUES (?, ?, ?, ?)', rows)
+    finally:
+        con.close()
+
+def _maestro_state(named_dfs, db_path=None):
+    """Hash of the maestro source digest and of the identity_map rows of this season's players.
+
+    Either one changing alters maestro columns of rows whose FBRef stats did not change,
+    so it is stored in the snapshot next to the row hashes.
+    """
+    mapped = [entry[:3] for entry in _season_identity_map(named_dfs, db_path)]
+    con = _connect_maestro_store(db_path)
+    try:
+        row = con.execute("SELECT value FROM maestro_meta WHERE key = 'source_sha256'").fetchone()
+    finally:
+        con.close()
+    return hashlib.sha256(json.dumps([row[0] if row else None, mapped]).encode('utf-8')).hexdigest()
+
+def _with_maestro_state(snapshot, named_dfs):
+    """Appends the maestro state row to a snapshot built by _stat_snapshot."""
+    state = pd.DataFrame({'stat': [_MAESTRO_SNAPSHOT_KEY], 'PlSqu': [_MAESTRO_SNAPSHOT_KEY], 'row_hash': [_maestro_state(named_dfs)]})
+    return pd.concat([snapshot, state], ignore_index=True)
+
+def _read_merged_output(output_path, dtypes_path):
+    """Reads the merged CSV back with the dtypes it had when it was written, or None.
+
+    Without them every stat column comes back as float64 (Int16 with NAs included), and
+    rows written again from that frame change format ('46.2' -> '46.20000076293945').
+    """
+    try:
+        with open(dtypes_path, 'r', encoding='utf-8') as fh:
+            dtypes = json.load(fh)
+        # Text columns are read as str so values such as '007' keep their exact form
+        dtypes = {col: str if dtype == 'object' else dtype for col, dtype in dtypes.items()}
+        return pd.read_csv(output_path, encoding='utf-8', dtype=dtypes)
+    except (OSError, ValueError, TypeError):
+        return None
+
+def _align_dtypes(patch, existing):
+    """Casts the columns patch shares with existing to existing's dtypes.
+
+    Concatenating float32 rows with float64 ones (or Int16 with float64) upcasts the whole
+    column, which changes how every row is written to the CSV.
+    """
+    patch = patch.reindex(columns=list(patch.columns) + [col for col in existing.columns if col not in patch.columns])
+    columns = {}
+    for col in patch.columns:
+        values = patch[col]
+        if col in existing.columns and values.dtype != existing[col].dtype:
+            try:
+                values = values.astype(existing[col].dtype)
+            except (TypeError, ValueError):
+                pass # Keep the patch dtype; the column is upcast for every row
+        columns[col] = values
+    return pd.DataFrame(columns, index=patch.index)
+
+def _patch_merged_rows(existing, patch, affected_keys):
+    """Replaces the affected rows of existing with patch, keeping every other row in place.
+
+    Updated players keep their old position, new players are appended at the end.
+    Returns (patched DataFrame, added keys, updated keys, removed keys).
+    """
+    touched = existing['PlSqu'].isin(affected_keys)
+    old_keys = set(existing.loc[touched, 'PlSqu'])
+    patch_keys = set(patch['PlSqu']) if not patch.empty else set()
+    first_position = pd.Series(np.arange(len(existing)), index=existing['PlSqu'].to_numpy()).groupby(level=0).first()
+
+    kept = existing.loc[~touched].assign(_position=np.flatnonzero(~touched.to_numpy()).astype('float64'))
+    pieces = [kept]
+    if not patch.empty:
+        patch_positions = patch['PlSqu'].map(first_position).astype('float64')
+        new_rows = patch_positions.isna().to_numpy()
+        patch_positions[new_rows] = len(existing) + np.arange(new_rows.sum())
+        pieces.append(_align_dtypes(patch, existing).assign(_position=patch_positions.to_numpy()))
+    patched = pd.concat(pieces, ignore_index=True)
+    patched = patched.sort_values('_position', kind='stable').drop(columns='_position').reset_index(drop=True)
+    columns = list(existing.columns) + [col for col in patched.columns if col not in existing.columns]
+    return patched[columns], sorted(patch_keys - old_keys), sorted(patch_keys & old_keys), sorted(old_keys - patch_keys)
+
+def _merge_and_export_incremental(named_dfs, season_str, competition='Big5', formats=None):
+    """Re-merges only the players whose rows changed since the last snapshot and patches the output.
+
+    Each freshly fetched stat table is hashed per PlSqu and compared with the snapshot of
+    the previous run. Only keys with a new, changed or vanished row go through the merge,
+    cleaning and maestro join again; the stored CSV is patched and the change is logged in
+    data/changelog. Without a usable snapshot (first run, new columns) or when players.csv
+    or the identity_map entries of the season changed, it rebuilds fully so every row is
+    joined with the current maestro. The season's identity_map entries are saved next to
+    the snapshot and loaded back first, so a run with an empty cache/ (a fresh CI runner)
+    sees the same maestro state as the run that wrote the snapshot.
+
+    The CSV is read back with the dtypes recorded next to the snapshot, so untouched rows
+    are written exactly as the full build wrote them.
+    """
+    base_name = _merged_output_name(competition)
+    output_path = os.path.join(_DATA_DIR, f'{base_name}_{season_str}.csv')
+    snapshot_path = os.path.join(_snapshot_dir(), f'{base_name}_{season_str}.csv')
+    dtypes_path = os.path.join(_snapshot_dir(), f'{base_name}_{season_str}.dtypes.json')
+    identity_path = os.path.join(_snapshot_dir(), f'{base_name}_{season_str}.identity.json')
+    if not named_dfs:
+        print(f"No se obtuvieron datos de ninguna tabla para {season_str}. No se puede mergear.")
+        return None
+    current = _stat_snapshot(named_dfs)
+    _restore_identity_map(identity_path)
+
+    previous = None
+    existing = _read_merged_output(output_path, dtypes_path) if os.path.exists(snapshot_path) else None
+    if existing is not None:
+        previous = pd.read_csv(snapshot_path, dtype=str, keep_default_na=False)
+        columns_now = current[current['PlSqu'] == _COLUMNS_SNAPSHOT_KEY]
+        columns_before = previous[previous['PlSqu'] == _COLUMNS_SNAPSHOT_KEY]
+        if set(zip(columns_now['stat'], columns_now['row_hash'])) != set(zip(columns_before['stat'], columns_before['row_hash'])):
+            print("Las tablas cambiaron de columnas desde el último snapshot. Se reconstruye la temporada completa.")
+            previous = None
+    if previous is not None:
+        try:
+            with _span('maestro_refresh'):
+                _refresh_maestro_store()
+        except Exception as e: # The join reports the failure; compare with the store as it is
+            print(f"Advertencia: no se pudo actualizar el maestro local: {e}")
+        maestro_before = previous.loc[previous['PlSqu'] == _MAESTRO_SNAPSHOT_KEY, 'row_hash'].tolist()
+        if maestro_before != [_maestro_state(named_dfs)]:
+            print("El maestro (players.csv o identity_map) cambió desde el último snapshot. Se reconstruye la temporada completa.")
+            previous = None
+
+    if previous is None:
+        print("Modo incremental: no hay snapshot previo utilizable, se hace un merge completo.")
+        merged = _merge_and_clean_season([df for _, df in named_dfs], season_str)
+        if merged is not None:
+            _export_merged_data(merged, base_name, season_str, formats)
+        change = {'mode': 'full', 'rows': len(merged) if merged is not None else 0}
+    else:
+        # Any (stat, key, hash) triple present in only one of the snapshots marks its key as affected
+        triples_now = set(zip(current['stat'], current['PlSqu'], current['row_hash']))
+        triples_before = set(zip(previous['stat'], previous['PlSqu'], previous['row_hash']))
+        moved = {(stat, key, row_hash) for stat, key, row_hash in triples_now ^ triples_before
+                 if key not in (_COLUMNS_SNAPSHOT_KEY, _MAESTRO_SNAPSHOT_KEY)}
+        affected_keys = {key for _, key, _ in moved}
+        changed_by_stat = {}
+        for stat, key, _ in moved:
+            changed_by_stat.setdefault(stat, set()).add(key)
+        if not affected_keys:
+            print(f"Modo incremental: sin cambios para {season_str}. No se reescribe la salida.")
+            merged = None
+            change = {'mode': 'incremental', 'added': [], 'updated': [], 'removed': []}
+        else:
+            print(f"Modo incremental: {len(affected_keys)} jugadores con cambios para {season_str}.")
+            subset_dfs = [df[df['PlSqu'].isin(affected_keys)] for _, df in named_dfs]
+            patch = None
+            if all(not df.empty for df in subset_dfs): # An empty table means no key survives the inner join
+                patch = _merge_and_clean_season(subset_dfs, season_str)
+            if patch is None:
+                patch = pd.DataFrame(columns=['PlSqu'])
+            merged, added, updated, removed = _patch_merged_rows(existing, patch, affected_keys)
+            _export_merged_data(merged, base_name, season_str, formats)
+            change = {
+                'mode': 'incremental', 'added': added, 'updated': updated, 'removed': removed,
+                'changed_by_stat': {stat: sorted(keys) for stat, keys in changed_by_stat.items()},
+            }
+            print(f"Salida parcheada: {len(added)} nuevos, {len(updated)} actualizados, {len(removed)} eliminados.")
+
+    os.makedirs(_snapshot_dir(), exist_ok=True)
+    if merged is not None:
+        with open(dtypes_path, 'w', encoding='utf-8') as fh:
+            json.dump(merged.dtypes.astype(str).to_dict(), fh, indent=0)
+    # The maestro state is read after the join so identity matches made by this run are included
+    _with_maestro_state(current, named_dfs).to_csv(snapshot_path, encoding='utf-8', index=False)
+    with open(identity_path, 'w', encoding='utf-8') as fh:
+        json.dump(_season_identity_map(named_dfs), fh, indent=0)
+    os.makedirs(_changelog_dir(), exist_ok=True)
+    change = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'season': season_str, 'competition': competition, **change}
+    with open(os.path.join(_changelog_dir(), f'{base_name}_{season_str}.jsonl'), 'a', encoding='utf-8') as fh:
+        fh.write(json.dumps(change, ensure_ascii=False) + '\n')
+    return change
+
+# --- Batch Backfill ---
+def _backfill_manifest_path():
+    """Default checkpoint manifest, data/backfill_manifest.json under the _DATA_DIR in effect."""
+    return os.path.join(_DATA_DIR, 'backfill_manifest.json')
+
+def _load_backfill_manifest(manifest_path):
+    """Reads the checkpoint manifest of a backfill, or returns an empty one."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {'completed': {}}
+
+# Module settings a merge worker needs to behave like the parent (replay URLs, output and cache dirs, ...)
+_MERGE_WORKER_SETTINGS = (
+    '_DATA_DIR', '_MAESTRO_URL', '_MAESTRO_DB', '_HTTP_HEADERS', '_HTTP_CACHE_ENABLED', '_HTTP_CACHE_DIR',
+    '_HTTP_CACHE_TTL', '_HTTP_CACHE_MAX_BYTES', '_HOST_REQUESTS_PER_MINUTE', '_SPAN_LOG_PATH', '_PROFILE_SPANS', '_PROFILE_DIR',
+)
+
+def _init_merge_worker(settings):
+    """Applies the parent's settings in a freshly spawned merge worker."""
+    globals().update(settings)
+
+def _merge_process_pool(max_workers=None):
+    """Process pool for merges whose workers are spawned, not forked.
+
+    A forked child inherits whatever locks the fetch threads hold at that moment
+    (spans, fetch/memory records, the HTTP cache) and can deadlock on them. Spawned
+    workers start from a fresh import, so the current settings are passed explicitly.
+    """
+    settings = {name: globals()[name] for name in _MERGE_WORKER_SETTINGS}
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_merge_worker, initargs=(settings,))
+
+def backfill(start_years, competitions=('Big5',), manifest_path=None, merge_workers=None, formats=None, memory_report=False):
+    """Builds the merged tables for every (season, competition) pair as one job graph.
+
+    All stat pages are queued at once on the rate-limited fetch pool; as soon as the
+    pages of a season are in, its merge/clean runs in a process pool while other
+    fetches are still pending. Finished seasons are checkpointed in a manifest so a
+    crashed run resumes where it stopped (pages already downloaded come from the cache).
+    """
+    manifest_path = manifest_path or _backfill_manifest_path()
+    manifest = _load_backfill_manifest(manifest_path)
+    for competition in competitions:
+        if competition not in _COMPETITIONS:
+            raise ValueError(f"Competición desconocida: '{competition}'. Opciones: {', '.join(_COMPETITIONS)}")
+
+    jobs = []
+    for start_year in start_years:
+        for competition in competitions:
+            season_str = _get_season_string(start_year)
+            key = f"{season_str}/{competition}"
+            # A live season is always rebuilt; only completed seasons are final.
+            if key in manifest['completed'] and _is_season_frozen(season_str):
+                print(f"Omitiendo {key}: ya completado según el manifiesto.")
+            else:
+                jobs.append((start_year, competition, key))
+    if not jobs:
+        print("No hay temporadas pendientes en el backfill.")
+        return manifest
+
+    print(f"Backfill: {len(jobs)} temporada(s)/competición(es), {len(jobs) * len(STAT_TABLES)} páginas planificadas.")
+    fetch_pool = ThreadPoolExecutor(max_workers=_FETCH_WORKERS)
+    merge_pool = _merge_process_pool(merge_workers)
+    try:
+        pending_fetches = {}
+        fetch_owner = {}
+        for start_year, competition, key in jobs:
+            futures = [fetch_pool.submit(fetch_stat_table, stat, start_year=start_year, return_df=True, competition=competition)
+                       for stat in STAT_TABLES]
+            pending_fetches[key] = futures
+            for future in futures:
+                fetch_owner[future] = key
+
+        merges = {}
+        outstanding = set(fetch_owner)
+        while outstanding or merges:
+            done, _ = wait(outstanding | set(merges), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in merges:
+                    key = merges.pop(future)
+                    try:
+                        shape = future.result()
+                    except Exception as e:
+                        print(f"Error en el merge de {key}: {e}")
+                        continue
+                    if shape is None:
+                        print(f"Advertencia: {key} no produjo datos; no se marca como completado.")
+                        continue
+                    manifest['completed'][key] = {'rows': shape[0], 'columns': shape[1], 'finished_at': datetime.now().isoformat(timespec='seconds')}
+                    _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+                    print(f"Backfill: {key} completado ({shape[0]} filas).")
+                    continue
+
+                outstanding.discard(future)
+                key = fetch_owner.pop(future)
+                if any(f in outstanding for f in pending_fetches[key]):
+                    continue
+                all_dfs = []
+                for f in pending_fetches.pop(key): # Stat order matters: the first table is the merge base
+                    try:
+                        df = f.result()
+                    except Exception as e:
+                        print(f"Error al obtener una tabla de {key}: {e}")
+                        continue
+                    if df is not None and not df.empty:
+                        all_dfs.append(df)
+                season_str, competition = key.split('/')
+                merges[merge_pool.submit(_merge_and_export_season, all_dfs, season_str, competition, formats)] = key
+    finally:
+        fetch_pool.shutdown(wait=True)
+        merge_pool.shutdown(wait=True)
+    if memory_report:
+        _write_memory_report('backfill')
+    else:
+        get_memory_report(reset=True)
+    return manifest
+
+# --- Streaming Merge ---
+_STREAM_SPILL_DIR = os.path.join('.', 'cache', 'stream')
+_STREAM_PARTITIONS = 16
+_STREAM_PARTITION_MODES = ('hash', 'competition')
+
+def _partition_labels(df, partition_by='hash', partitions=None):
+    """Returns the partition of every row: a bucket of the PlSqu hash, or the competition."""
+    if partition_by == 'competition':
+        if 'Comp' not in df.columns: # Single-league pages have no Comp column
+            return pd.Series('all', index=df.index)
+        return _map_unique(df['Comp'], _partition_value, null_value='unknown')
+    buckets = pd.util.hash_pandas_object(df['PlSqu'].astype(str), index=False).to_numpy() % (partitions or _STREAM_PARTITIONS)
+    return pd.Series(buckets, index=df.index).astype(str).str.zfill(3)
+
+def _spill_stat_table(stat, start_year, competition, spill_dir, partition_by='hash', partitions=None):
+    """Fetches one stat table and writes it as spill_dir/<partition>/<stat>.pkl. Returns the partitions written."""
+    df = fetch_stat_table(stat, start_year=start_year, return_df=True, competition=competition)
+    if df is None or df.empty:
+        return set()
+    labels = _partition_labels(df, partition_by, partitions)
+    for label, rows in df.groupby(labels, sort=False):
+        os.makedirs(os.path.join(spill_dir, label), exist_ok=True)
+        rows.to_pickle(os.path.join(spill_dir, label, f'{stat}.pkl'))
+    return set(labels.unique())
+
+class _StreamingExport:
+    """Appends merged partitions to the season outputs, which replace the old ones on close()."""
+
+    def __init__(self, base_name, season, formats=None):
+        self.base_name = base_name
+        self.season = season
+        self.formats = [fmt for fmt in formats or _DEFAULT_EXPORT_FORMATS if fmt in _EXPORTERS]
+        self.csv_path = os.path.join(_DATA_DIR, f'{base_name}_{season}.csv')
+        self.staging = {} # Columnar format -> staging directory next to the final season directory
+        self.columns = None
+        self.rows = 0
+        self.parts = 0
+
+    def append(self, df):
+        """Writes one merged partition to every output format."""
+        if self.columns is None:
+            self.columns = list(df.columns)
+            for fmt in self.formats:
+                if fmt != 'csv' and _can_export_columnar(df, self.base_name, self.season, fmt):
+                    staging = os.path.join(_DATA_DIR, fmt, self.base_name, f'.season={self.season}.partial')
+                    shutil.rmtree(staging, ignore_errors=True)
+                    self.staging[fmt] = staging
+        else:
+            extra = [col for col in df.columns if col not in self.columns]
+            if extra:
+                print(f"Advertencia: columnas ausentes en la primera partición descartadas: {', '.join(map(str, extra))}")
+            df = df.reindex(columns=self.columns)
+        with _span('export', format='+'.join(self.formats), season=self.season, partition=self.parts) as span:
+            span['rows_in'] = len(df)
+            if 'csv' in self.formats:
+                os.makedirs(_DATA_DIR, exist_ok=True)
+                df.to_csv(f'{self.csv_path}.partial', mode='a' if self.parts else 'w', header=not self.parts, encoding='utf-8', index=False)
+            for fmt, staging in self.staging.items():
+                _write_comp_partitions(df, staging, fmt, part=self.parts)
+        self.rows += len(df)
+        self.parts += 1
+
+    def close(self):
+        """Moves the finished outputs into place. Returns (rows, columns), or None if nothing was written."""
+        if not self.parts:
+            print(f"DataFrame para '{self.base_name}_{self.season}' está vacío. No se guardará.")
+            return None
+        if 'csv' in self.formats:
+            os.replace(f'{self.csv_path}.partial', self.csv_path)
+            print(f"Archivo CSV guardado en: {os.path.abspath(self.csv_path)}")
+        for fmt, staging in self.staging.items():
+            season_dir = os.path.join(_DATA_DIR, fmt, self.base_name, f'season={self.season}')
+            if os.path.isdir(season_dir):
+                shutil.rmtree(season_dir) # Drop stale competition partitions of a previous build
+            os.replace(staging, season_dir)
+            print(f"Archivos {fmt} guardados en: {os.path.abspath(season_dir)}")
+        return self.rows, len(self.columns)
+
+    def abort(self):
+        """Removes partial outputs after a failed build, leaving the previous outputs untouched."""
+        if os.path.exists(f'{self.csv_path}.partial'):
+            os.remove(f'{self.csv_path}.partial')
+        for staging in self.staging.values():
+            shutil.rmtree(staging, ignore_errors=True)
+
+def _merge_and_export_streaming(start_year=None, competition='Big5', formats=None, partition_by='hash', partitions=None):
+    """Builds one season partition by partition, so only a slice of the merge is in memory at once.
+
+    Every stat table is split by PlSqu hash (or by competition) into spill files as soon
+    as it is fetched, and released. Each partition is then joined, cleaned, matched with
+    the maestro and appended to the outputs before the next one is loaded. A player lands
+    in the same partition in every table, so the rows are those of the in-memory merge,
+    in partition order. Returns the (rows, columns) shape, or None.
+    """
+    if partition_by not in _STREAM_PARTITION_MODES:
+        raise ValueError(f"Partición desconocida: '{partition_by}'. Opciones: {', '.join(_STREAM_PARTITION_MODES)}")
+    season_str = _get_season_string(start_year)
+    base_name = _merged_output_name(competition)
+    print(f"Merge por partes ({partition_by}) para la temporada: {season_str} - {competition}")
+    os.makedirs(_STREAM_SPILL_DIR, exist_ok=True)
+    spill_dir = tempfile.mkdtemp(prefix=f'{base_name}_{season_str}_', dir=_STREAM_SPILL_DIR)
+    try:
+        # Each worker holds at most one table until it is spilled
+        with _span('scrape', season=season_str, competition=competition), ThreadPoolExecutor(max_workers=_FETCH_WORKERS) as executor:
+            futures = [(stat, executor.submit(_spill_stat_table, stat, start_year, competition, spill_dir, partition_by, partitions))
+                       for stat in STAT_TABLES]
+            written = {}
+            for stat, future in futures: # Keep the registry order; the first table is the merge base
+                try:
+                    labels = future.result()
+                except Exception as e:
+                    print(f"Error al obtener {stat}_stats para {season_str}: {e}")
+                    continue
+                if labels:
+                    written[stat] = labels
+                else:
+                    print(f"Advertencia: {stat}_stats devolvió un DataFrame vacío o None para {season_str}.")
+        if not written:
+            print(f"No se obtuvieron datos de ninguna tabla para {season_str}. No se puede mergear.")
+            return None
+
+        # A partition missing from any table cannot keep rows through the inner join
+        labels = sorted(set.intersection(*written.values()))
+        print(f"{len(labels)} particiones a mergear ({sum(len(l) for l in written.values())} ficheros intermedios).")
+        # The maestro is refreshed and blocked once, not once per partition
+        with _span('maestro_refresh', season=season_str):
+            maestro = _prepare_maestro_join()
+        export = _StreamingExport(base_name, season_str, formats)
+        try:
+            for label in labels:
+                with _span('partition', season=season_str, competition=competition, partition=label) as span:
+                    parts = [pd.read_pickle(os.path.join(spill_dir, label, f'{stat}.pkl')) for stat in written]
+                    span['rows_in'] = sum(len(part) for part in parts)
+                    merged = _merge_and_clean_season(parts, season_str, maestro)
+                    del parts
+                    if merged is not None and not merged.empty:
+                        span['rows_out'] = len(merged)
+                        export.append(merged)
+                    del merged
+            return export.close()
+        except BaseException:
+            export.abort()
+            raise
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+def stream_merge(start_years, competitions=('Big5',), formats=None, partition_by='hash', partitions=None, manifest_path=None, memory_report=False):
+    """Bounded-memory counterpart of backfill: (season, competition) pairs are built one after
+    another, each partition by partition, so peak memory does not grow with how many are included.
+
+    Uses the same checkpoint manifest as backfill.
+    """
+    manifest_path = manifest_path or _backfill_manifest_path()
+    manifest = _load_backfill_manifest(manifest_path)
+    for competition in competitions:
+        if competition not in _COMPETITIONS:
+            raise ValueError(f"Competición desconocida: '{competition}'. Opciones: {', '.join(_COMPETITIONS)}")
+
+    for start_year in start_years:
+        for competition in competitions:
+            season_str = _get_season_string(start_year)
+            key = f"{season_str}/{competition}"
+            if key in manifest['completed'] and _is_season_frozen(season_str):
+                print(f"Omitiendo {key}: ya completado según el manifiesto.")
+                continue
+            with _span('season', season=season_str, competition=competition):
+                shape = _merge_and_export_streaming(start_year, competition, formats, partition_by, partitions)
+            if memory_report:
+                _write_memory_report(f'{competition}_{season_str}')
+            else:
+                get_memory_report(reset=True)
+            if shape is None:
+                print(f"Advertencia: {key} no produjo datos; no se marca como completado.")
+                continue
+            manifest['completed'][key] = {'rows': shape[0], 'columns': shape[1], 'finished_at': datetime.now().isoformat(timespec='seconds')}
+            _write_atomic(manifest_path, json.dumps(manifest, indent=2).encode('utf-8'))
+            print(f"Merge por partes: {key} completado ({shape[0]} filas).")
+    return manifest
@@ -0,0 +1,87 @@
+"""Offline record/replay: saves a season's responses and serves them from a local HTTP server."""
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import hashlib
+import json
+import os
+import threading
+
+from . import pipeline
+from .pipeline import STAT_TABLES, _cached_get, _get_season_string, _write_atomic
+
+class _FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """Serves recorded fixtures with ETag/If-None-Match and Last-Modified/If-Modified-Since, without logging each request."""
+
+    def send_head(self):
+        self._etag = None
+        try:
+            with open(self.translate_path(self.path), 'rb') as fh:
+                self._etag = f'"{hashlib.sha256(fh.read()).hexdigest()[:16]}"'
+        except OSError: # Missing file or a directory: the base class answers
+            return super().send_head()
+        if self.headers.get('If-None-Match') == self._etag:
+            self.send_response(304)
+            self.end_headers()
+            return None
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, '_etag', None):
+            self.send_header('ETag', self._etag)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def _fixture_path(fixtures_dir, url):
+    """Maps a URL to fixtures_dir/<host>/<path>, the layout served by replay_fixtures."""
+    parsed = urlparse(url)
+    return os.path.join(fixtures_dir, parsed.netloc, *parsed.path.lstrip('/').split('/'))
+
+def record_fixtures(fixtures_dir, start_year=None, competition='Big5'):
+    """Saves the stat pages of a season and players.csv into fixtures_dir for offline replay."""
+    season = _get_season_string(start_year)
+    urls = [spec.url(season, competition) for spec in STAT_TABLES.values()] + [pipeline._MAESTRO_URL]
+    manifest = {'season': season, 'competition': competition, 'files': {}}
+    for url in urls:
+        print(f"Grabando {url}...")
+        content = _cached_get(url)
+        path = _fixture_path(fixtures_dir, url)
+        _write_atomic(path, content)
+        manifest['files'][url] = {'path': os.path.relpath(path, fixtures_dir), 'sha256': hashlib.sha256(content).hexdigest()}
+    _write_atomic(os.path.join(fixtures_dir, 'manifest.json'), json.dumps(manifest, indent=2).encode('utf-8'))
+    print(f"{len(urls)} respuestas grabadas en {os.path.abspath(fixtures_dir)}")
+    return manifest
+
+@contextmanager
+def replay_fixtures(fixtures_dir):
+    """Serves fixtures_dir from a local HTTP server and points FBRef and maestro URLs at it.
+
+    Yields the server's base URL. The local host gets an unthrottled token bucket so
+    replayed runs measure the pipeline, not the politeness delay.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_FixtureRequestHandler, directory=fixtures_dir))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    saved = (pipeline._FBREF_BASE_URL, pipeline._MAESTRO_URL, pipeline._HOST_REQUESTS_PER_MINUTE.get('127.0.0.1'))
+    maestro = urlparse(pipeline._MAESTRO_URL)
+    pipeline._FBREF_BASE_URL = f'{base_url}/{urlparse(pipeline._FBREF_BASE_URL).netloc}'
+    pipeline._MAESTRO_URL = f'{base_url}/{maestro.netloc}{maestro.path}'
+    pipeline._HOST_REQUESTS_PER_MINUTE['127.0.0.1'] = 60_000
+    with pipeline._host_buckets_lock:
+        pipeline._host_buckets.pop('127.0.0.1', None)
+    try:
+        yield base_url
+    finally:
+        pipeline._FBREF_BASE_URL, pipeline._MAESTRO_URL, budget = saved
+        if budget is None:
+            pipeline._HOST_REQUESTS_PER_MINUTE.pop('127.0.0.1', None)
+        else:
+            pipeline._HOST_REQUESTS_PER_MINUTE['127.0.0.1'] = budget
+        with pipeline._host_buckets_lock:
+            pipeline._host_buckets.pop('127.0.0.1', None)
+        server.shutdown()
+        server.server_close()
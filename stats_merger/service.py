@@ -0,0 +1,309 @@
+"""Long-running service: a job queue for season rebuilds and a JSON query API over merged seasons."""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+from . import pipeline
+from ._lazy import np, pd
+from .analytics import similar_players
+from .pipeline import (STAT_TABLES, _CATEGORICAL_COLUMNS, _COMPETITIONS, _export_merged_data, _generar_player_codes,
+                       _get_season_string, _merge_and_clean_season, _merged_output_name, _span, _unidecode_cached,
+                       fetch_stat_table, read_merged_data)
+
+_SERVICE_HOST = '127.0.0.1'
+_SERVICE_PORT = 8765
+_SERVICE_JOB_WORKERS = 2
+_SERVICE_CACHED_SEASONS = 4 # Merged (season, competition) tables kept in memory, least recently used dropped first
+_SEASON_PARAM_RE = re.compile(r'^(\d{4})(?:-(\d{4}))?$')
+
+def _parse_season_param(value):
+    """Accepts '2023' or '2023-2024' and returns the season string."""
+    match = _SEASON_PARAM_RE.match(str(value or '').strip())
+    if not match or (match.group(2) and int(match.group(2)) != int(match.group(1)) + 1):
+        raise ValueError(f"Temporada no válida: '{value}'. Usa '2023' o '2023-2024'.")
+    return _get_season_string(int(match.group(1)))
+
+def _split_param(values):
+    """Turns repeated and comma-separated query values into one list."""
+    return [item.strip() for value in values or [] for item in value.split(',') if item.strip()]
+
+def _filter_players(df, squads=None, comps=None, positions=None, player=None):
+    """Vectorized filters for the query API; every filter is case-insensitive and optional."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, wanted in (('Squad', squads), ('Comp', comps)):
+        if wanted and col in df.columns:
+            wanted = {_unidecode_cached(value).lower() for value in wanted}
+            mask &= df[col].astype(str).str.lower().isin(wanted).to_numpy()
+    if positions and 'Pos' in df.columns:
+        # Pos holds lists such as 'DF,MF'; any listed position matches
+        pattern = r'(?:^|,)\s*(?:' + '|'.join(re.escape(pos) for pos in positions) + r')\s*(?:,|$)'
+        mask &= df['Pos'].astype(str).str.contains(pattern, case=False, regex=True).to_numpy()
+    if player:
+        slug = _generar_player_codes(pd.Series([player]))[0] or ''
+        codes = df['player_code'] if 'player_code' in df.columns else pd.Series(_generar_player_codes(df['Player']), index=df.index)
+        mask &= codes.fillna('').str.contains(slug, regex=False).to_numpy()
+    return df[mask]
+
+class ScraperService:
+    """In-process job queue and LRU of merged seasons behind the HTTP API.
+
+    Jobs for the same (season, competition) are merged while one is queued or running,
+    and concurrent fetches of the same (stat, season, competition) share one request.
+    """
+
+    def __init__(self, job_workers=None, cached_seasons=None, export=True, formats=None):
+        self.cached_seasons = cached_seasons or _SERVICE_CACHED_SEASONS
+        self.export = export
+        self.formats = formats
+        self.jobs = {}
+        self.active_jobs = {} # (season, competition) -> job id while queued or running
+        self.job_ids = itertools.count(1)
+        self.job_queue = queue.Queue()
+        self.seasons = OrderedDict() # (season, competition) -> merged DataFrame
+        self.inflight_fetches = {}
+        self.lock = threading.Lock()
+        self.fetch_pool = ThreadPoolExecutor(max_workers=pipeline._FETCH_WORKERS)
+        self.workers = [threading.Thread(target=self._work, name=f'service-job-{i}', daemon=True)
+                        for i in range(job_workers or _SERVICE_JOB_WORKERS)]
+        for worker in self.workers:
+            worker.start()
+
+    def fetch_stat(self, stat, season, competition='Big5'):
+        """Returns a future for one stat table, shared with any identical fetch in flight."""
+        if stat not in STAT_TABLES:
+            raise ValueError(f"Estadística desconocida: '{stat}'. Opciones: {', '.join(STAT_TABLES)}")
+        key = (stat, season, competition)
+        with self.lock:
+            future = self.inflight_fetches.get(key)
+            if future is None:
+                start_year = int(season.split('-')[0])
+                future = self.fetch_pool.submit(fetch_stat_table, stat, start_year=start_year, return_df=True, competition=competition)
+                self.inflight_fetches[key] = future
+                future.add_done_callback(lambda _, key=key: self._forget_fetch(key))
+            return future
+
+    def _forget_fetch(self, key):
+        with self.lock:
+            self.inflight_fetches.pop(key, None)
+
+    def submit(self, season, competition='Big5'):
+        """Queues a rebuild of one season; returns the existing job if one is already pending."""
+        if competition not in _COMPETITIONS:
+            raise ValueError(f"Competición desconocida: '{competition}'. Opciones: {', '.join(_COMPETITIONS)}")
+        with self.lock:
+            job_id = self.active_jobs.get((season, competition))
+            if job_id is not None:
+                return dict(self.jobs[job_id])
+            job_id = next(self.job_ids)
+            self.jobs[job_id] = {'id': job_id, 'season': season, 'competition': competition, 'status': 'queued',
+                                 'submitted': datetime.now().isoformat(timespec='seconds')}
+            self.active_jobs[(season, competition)] = job_id
+        self.job_queue.put(job_id)
+        return dict(self.jobs[job_id])
+
+    def job(self, job_id):
+        with self.lock:
+            return dict(self.jobs[job_id]) if job_id in self.jobs else None
+
+    def list_jobs(self):
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def _work(self):
+        while True:
+            job_id = self.job_queue.get()
+            if job_id is None:
+                return
+            with self.lock:
+                job = self.jobs[job_id]
+                job['status'] = 'running'
+            try:
+                shape = self._run_job(job['season'], job['competition'])
+                update = {'status': 'done', 'rows': shape[0], 'columns': shape[1]} if shape else {'status': 'empty'}
+            except Exception as e:
+                print(f"Error en el trabajo {job_id} ({job['season']} - {job['competition']}): {e}")
+                update = {'status': 'failed', 'error': str(e)}
+            with self.lock:
+                job.update(update, finished=datetime.now().isoformat(timespec='seconds'))
+                self.active_jobs.pop((job['season'], job['competition']), None)
+
+    def _run_job(self, season, competition):
+        """Fetches every stat table (deduplicated), merges, exports and caches one season."""
+        with _span('service_job', season=season, competition=competition):
+            futures = [self.fetch_stat(stat, season, competition) for stat in STAT_TABLES]
+            all_dfs = [df for df in (future.result() for future in futures) if df is not None and not df.empty]
+            merged = _merge_and_clean_season(all_dfs, season)
+        if merged is None or merged.empty:
+            return None
+        if self.export:
+            _export_merged_data(merged, _merged_output_name(competition), season, self.formats)
+        self._remember(season, competition, merged)
+        return merged.shape
+
+    def _remember(self, season, competition, df):
+        with self.lock:
+            self.seasons[(season, competition)] = df
+            self.seasons.move_to_end((season, competition))
+            while len(self.seasons) > self.cached_seasons:
+                self.seasons.popitem(last=False)
+
+    def season_table(self, season, competition='Big5'):
+        """Returns the merged table from memory, loading the exported output once on a miss (None if absent)."""
+        with self.lock:
+            df = self.seasons.get((season, competition))
+            if df is not None:
+                self.seasons.move_to_end((season, competition))
+                return df
+        base_name = _merged_output_name(competition)
+        csv_path = os.path.join(pipeline._DATA_DIR, f'{base_name}_{season}.csv')
+        if os.path.isdir(os.path.join(pipeline._DATA_DIR, 'parquet', base_name, f'season={season}')):
+            df = read_merged_data(base_name, seasons=[season]).drop(columns='season')
+        elif os.path.exists(csv_path):
+            df = pd.read_csv(csv_path, encoding='utf-8')
+            for col in _CATEGORICAL_COLUMNS:
+                if col in df.columns:
+                    df[col] = df[col].astype('category')
+        else:
+            return None
+        self._remember(season, competition, df)
+        return df
+
+    def cached(self):
+        with self.lock:
+            return [{'season': season, 'competition': competition, 'rows': len(df)} for (season, competition), df in self.seasons.items()]
+
+    def close(self):
+        for _ in self.workers:
+            self.job_queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.fetch_pool.shutdown(wait=True)
+
+class _ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a ScraperService (available as self.server.service).
+
+    GET  /health                                      status, cached seasons and queued jobs
+    GET  /jobs, /jobs/<id>                            job status
+    POST /jobs?season=2023&competition=Big5           queue a season rebuild (202)
+    GET  /seasons/<season>/players?competition=Big5&squad=&comp=&pos=&player=&columns=&limit=
+    GET  /seasons/<season>/stats/<stat>?competition=Big5
+    GET  /seasons/<season>/similar?player=&k=         nearest players from the analytics index
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload=None, raw=None):
+        body = raw if raw is not None else json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_frame(self, season, competition, df):
+        records = df.to_json(orient='records', force_ascii=False)
+        head = json.dumps({'season': season, 'competition': competition, 'rows': len(df)}, ensure_ascii=False)
+        self._send_json(200, raw=f'{head[:-1]}, "data": {records}}}'.encode('utf-8'))
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        parts = [part for part in url.path.split('/') if part]
+        service = self.server.service
+        try:
+            if method == 'GET' and parts == ['health']:
+                return self._send_json(200, {'status': 'ok', 'cached': service.cached(), 'queued': service.job_queue.qsize()})
+            if parts[:1] == ['jobs']:
+                if method == 'POST' and len(parts) == 1:
+                    season = _parse_season_param(params.get('season', [None])[0])
+                    competition = params.get('competition', ['Big5'])[0]
+                    return self._send_json(202, service.submit(season, competition))
+                if method == 'GET' and len(parts) == 1:
+                    return self._send_json(200, service.list_jobs())
+                if method == 'GET' and len(parts) == 2 and parts[1].isdigit():
+                    job = service.job(int(parts[1]))
+                    return self._send_json(200, job) if job else self._send_json(404, {'error': f'Trabajo {parts[1]} no encontrado.'})
+            if method == 'GET' and len(parts) >= 3 and parts[0] == 'seasons':
+                season = _parse_season_param(parts[1])
+                competition = params.get('competition', ['Big5'])[0]
+                if parts[2:] == ['players']:
+                    return self._query_players(service, season, competition, params)
+                if len(parts) == 4 and parts[2] == 'stats':
+                    df = service.fetch_stat(parts[3], season, competition).result()
+                    if df is None or df.empty:
+                        return self._send_json(404, {'error': f"Sin datos de '{parts[3]}' para {season} - {competition}."})
+                    return self._send_frame(season, competition, df)
+                if parts[2:] == ['similar']:
+                    player = params.get('player', [None])[0]
+                    if not player:
+                        raise ValueError("Falta el parámetro 'player'.")
+                    k = params.get('k', [None])[0]
+                    try:
+                        df = similar_players(player, season, competition, k=int(k) if k else None)
+                    except FileNotFoundError as e:
+                        return self._send_json(404, {'error': str(e)})
+                    return self._send_frame(season, competition, df)
+            self._send_json(404, {'error': f'Ruta no encontrada: {method} {url.path}'})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            print(f"Error atendiendo {method} {self.path}: {e}")
+            self._send_json(500, {'error': str(e)})
+
+    def _query_players(self, service, season, competition, params):
+        df = service.season_table(season, competition)
+        if df is None:
+            return self._send_json(404, {'error': f'{season} - {competition} no está disponible. Lánzalo con POST /jobs?season={season}&competition={competition}.'})
+        df = _filter_players(df, squads=_split_param(params.get('squad')), comps=_split_param(params.get('comp')),
+                             positions=_split_param(params.get('pos')), player=params.get('player', [None])[0])
+        columns = _split_param(params.get('columns'))
+        if columns:
+            missing = [col for col in columns if col not in df.columns]
+            if missing:
+                raise ValueError(f"Columnas desconocidas: {', '.join(missing)}")
+            df = df[columns]
+        limit = params.get('limit', [None])[0]
+        if limit is not None:
+            df = df.head(int(limit))
+        self._send_frame(season, competition, df)
+
+def start_service(host=None, port=None, **service_options):
+    """Starts the API in a background thread and returns the server (server.service, server.server_port).
+
+    Call server.shutdown() and server.service.close() to stop it. Port 0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host or _SERVICE_HOST, _SERVICE_PORT if port is None else port), _ServiceRequestHandler)
+    server.daemon_threads = True
+    server.service = ScraperService(**service_options)
+    threading.Thread(target=server.serve_forever, name='service-http', daemon=True).start()
+    return server
+
+def serve(host=None, port=None, **service_options):
+    """Runs the service until interrupted (Ctrl+C)."""
+    server = start_service(host, port, **service_options)
+    print(f"Servicio escuchando en http://{server.server_address[0]}:{server.server_port} (Ctrl+C para detener)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("Deteniendo el servicio...")
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+from stats_merger import pipeline
+
+# The synthetic FBRef pages of the benchmarks double as test fixtures
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+
+@pytest.fixture
+def work_dirs(tmp_path, monkeypatch):
+    """Points the output, maestro store and HTTP cache at tmp_path and clears the fetch records."""
+    monkeypatch.setattr(pipeline, '_DATA_DIR', str(tmp_path / 'data'))
+    monkeypatch.setattr(pipeline, '_MAESTRO_DB', str(tmp_path / 'cache' / 'players.sqlite'))
+    monkeypatch.setattr(pipeline, '_HTTP_CACHE_DIR', str(tmp_path / 'cache' / 'http'))
+    monkeypatch.setattr(pipeline, '_HTTP_CACHE_ENABLED', True)
+    monkeypatch.setattr(pipeline, '_STREAM_SPILL_DIR', str(tmp_path / 'cache' / 'stream'))
+    pipeline.get_fetch_stats(reset=True)
+    return tmp_path
+
+
+def fetched_statuses():
+    """HTTP statuses of the requests made since the last call."""
+    with pipeline._fetch_records_lock:
+        statuses = [record['status'] for record in pipeline._fetch_records]
+        pipeline._fetch_records.clear()
+    return statuses
+
+
+def write_fixture(fixtures_dir, url, body):
+    """Stores body where replay_fixtures serves url from."""
+    from stats_merger.replay import _fixture_path
+    path = _fixture_path(fixtures_dir, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fh:
+        fh.write(body)
+    return path
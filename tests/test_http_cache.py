@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+
+from conftest import fetched_statuses, write_fixture
+
+from stats_merger import pipeline
+from stats_merger.replay import replay_fixtures
+
+
+def _edit_meta(url, **changes):
+    """Rewrites fields of a cached URL's index entry (None removes the field)."""
+    meta_path, _ = pipeline._cache_entry_paths(url)
+    with open(meta_path, encoding='utf-8') as fh:
+        meta = json.load(fh)
+    for key, value in changes.items():
+        if value is None:
+            meta.pop(key, None)
+        else:
+            meta[key] = value
+    with open(meta_path, 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+
+
+def test_fresh_entries_are_served_without_a_request(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    write_fixture(fixtures, 'https://example.com/page.html', b'<html>v1</html>')
+    with replay_fixtures(str(fixtures)) as base:
+        url = f'{base}/example.com/page.html'
+        assert pipeline._cached_get(url) == b'<html>v1</html>'
+        assert pipeline._cached_get(url) == b'<html>v1</html>'
+    assert fetched_statuses() == [200]
+
+
+def test_expired_entries_revalidate_with_last_modified(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    write_fixture(fixtures, 'https://example.com/page.html', b'<html>v1</html>')
+    with replay_fixtures(str(fixtures)) as base:
+        url = f'{base}/example.com/page.html'
+        pipeline._cached_get(url)
+        _edit_meta(url, etag=None) # Only If-Modified-Since is sent
+        assert pipeline._cached_get(url, ttl=0) == b'<html>v1</html>'
+    assert fetched_statuses() == [200, 304]
+
+
+def test_etag_round_trip(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    path = write_fixture(fixtures, 'https://example.com/page.html', b'<html>v1</html>')
+    with replay_fixtures(str(fixtures)) as base:
+        url = f'{base}/example.com/page.html'
+        pipeline._cached_get(url)
+        meta, _ = pipeline._read_cache_entry(url)
+        assert meta['etag']
+        _edit_meta(url, last_modified=None) # Only If-None-Match is sent
+        assert pipeline._cached_get(url, ttl=0) == b'<html>v1</html>'
+
+        with open(path, 'wb') as fh:
+            fh.write(b'<html>v2</html>')
+        assert pipeline._cached_get(url, ttl=0) == b'<html>v2</html>'
+        assert pipeline._read_cache_entry(url)[0]['etag'] != meta['etag']
+    assert fetched_statuses() == [200, 304, 200]
+
+
+def test_completed_seasons_are_never_revalidated(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    write_fixture(fixtures, 'https://fbref.com/en/comps/9/2019-2020/stats/page.html', b'<html>old</html>')
+    write_fixture(fixtures, 'https://fbref.com/en/comps/9/stats/page.html', b'<html>live</html>')
+    with replay_fixtures(str(fixtures)) as base:
+        frozen_url = f'{base}/fbref.com/en/comps/9/2019-2020/stats/page.html'
+        live_url = f'{base}/fbref.com/en/comps/9/stats/page.html'
+        assert pipeline._is_frozen_url(frozen_url) and not pipeline._is_frozen_url(live_url)
+        pipeline._cached_get(frozen_url)
+        pipeline._cached_get(live_url)
+        assert fetched_statuses() == [200, 200]
+
+        assert pipeline._cached_get(frozen_url, ttl=0) == b'<html>old</html>'
+        assert fetched_statuses() == []
+        assert pipeline._cached_get(live_url, ttl=0) == b'<html>live</html>'
+        assert fetched_statuses() == [304]
+
+
+def test_lru_eviction_counts_shared_bodies_once(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    shared, other = b'a' * 1000, b'b' * 1000
+    write_fixture(fixtures, 'https://example.com/a.html', shared)
+    write_fixture(fixtures, 'https://example.com/b.html', shared)
+    write_fixture(fixtures, 'https://example.com/c.html', other)
+    with replay_fixtures(str(fixtures)) as base:
+        urls = [f'{base}/example.com/{name}.html' for name in 'abc']
+        for url in urls:
+            pipeline._cached_get(url)
+    # Access order: b (oldest), then a, then c
+    for when, url in zip((300, 100, 400), urls):
+        os.utime(pipeline._cache_entry_paths(url)[0], (when, when))
+
+    # a and b share one body: 2,000 bytes are stored, not 3,000
+    pipeline._evict_http_cache(max_bytes=2000)
+    assert pipeline.http_cache_info()['urls'] == 3
+
+    # Dropping b alone frees nothing, so a goes too; the shared body is deleted with its last URL
+    pipeline._evict_http_cache(max_bytes=1500)
+    assert [pipeline._read_cache_entry(url)[1] for url in urls] == [None, None, other]
+    assert sorted(os.listdir(os.path.join(pipeline._HTTP_CACHE_DIR, 'bodies'))) == [hashlib.sha256(other).hexdigest()]
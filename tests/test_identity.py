@@ -0,0 +1,42 @@
+import sqlite3
+
+import pandas as pd
+
+from stats_merger import pipeline
+
+
+def _maestro_store(path, players):
+    """A local maestro store holding (name, date_of_birth, country_of_citizenship) rows."""
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE maestro (player_code_maestro, name, date_of_birth, country_of_citizenship)')
+    codes = pipeline._generar_player_codes(pd.Series([name for name, _, _ in players]))
+    con.executemany('INSERT INTO maestro VALUES (?, ?, ?, ?)', [(code, *player) for code, player in zip(codes, players)])
+    con.commit()
+    con.close()
+
+
+def test_fuzzy_matches_reordered_and_accented_names(tmp_path):
+    db_path = str(tmp_path / 'players.sqlite')
+    _maestro_store(db_path, [
+        ('Heung-min Son', '1992-07-08', 'Korea, South'),
+        ('Kylian Mbappé', '1998-12-20', 'France'),
+        ('Mesut Oezil', '1988-10-15', 'Germany'),
+    ])
+    df = pd.DataFrame({
+        'Player': ['Son Heung-min', 'Kylian Mbappé', 'Mesut Özil', 'Nobody Known'],
+        'Born': [1992, 1998, 1988, 2001],
+        'Nation': ['KOR', 'FRA', 'GER', 'ESP'],
+    })
+    df['player_code'] = pipeline._generar_player_codes(df['Player'])
+
+    resolved, report = pipeline._resolve_player_identities(df, db_path=db_path)
+
+    assert resolved.iloc[:3].tolist() == ['heung-min-son', 'kylian-mbappe', 'mesut-oezil']
+    assert pd.isna(resolved.iloc[3])
+    assert (report['exact'], report['fuzzy'], report['unmatched']) == (1, 2, 1)
+    assert report['exact'] + report['cached'] + report['fuzzy'] + report['ambiguous'] + report['unmatched'] == report['players']
+
+    # Accepted fuzzy matches are reused from identity_map on the next run
+    resolved, report = pipeline._resolve_player_identities(df, db_path=db_path)
+    assert resolved.iloc[:3].tolist() == ['heung-min-son', 'kylian-mbappe', 'mesut-oezil']
+    assert (report['exact'], report['cached'], report['fuzzy'], report['unmatched']) == (1, 2, 0, 1)
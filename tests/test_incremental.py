@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+
+import pandas as pd
+from conftest import write_fixture
+
+from stats_merger import pipeline
+from stats_merger.replay import replay_fixtures
+
+SEASON = '2023-2024'
+MAESTRO_CSV = (
+    'name,sub_position,current_club_name,market_value_in_eur,last_season,foot,height_in_cm,'
+    'contract_expiration_date,date_of_birth,country_of_citizenship\n'
+    'Heung-min Son,Left Winger,Tottenham,45000000,2023,both,183,2025-06-30,1992-07-08,"Korea, South"\n'
+    'Bukayo Saka,Right Winger,Arsenal,120000000,2023,left,178,2027-06-30,2001-09-05,England\n'
+).encode('utf-8')
+
+
+def _named_dfs():
+    """Two cleaned stat tables; 'Son Heung-min' only reaches the maestro through a fuzzy match."""
+    players = pd.DataFrame({
+        'Player': ['Son Heung-min', 'Bukayo Saka'], 'Nation': ['kr KOR', 'eng ENG'], 'Pos': ['FW', 'FW'],
+        'Squad': ['Tottenham', 'Arsenal'], 'Comp': ['eng Premier League'] * 2, 'Age': ['31-100', '22-050'],
+        'Born': [1992, 2001],
+    })
+    players['PlSqu'] = players['Player'] + players['Squad']
+    standard = players.assign(Gls=[17, 14])
+    shooting = players[['Player', 'Squad', 'PlSqu']].assign(Sh=[70, 85])
+    return [('standard', standard), ('shooting', shooting)]
+
+
+def test_cold_cache_rerun_with_unchanged_input_is_a_no_op(work_dirs):
+    fixtures = work_dirs / 'fixtures'
+    write_fixture(fixtures, pipeline._MAESTRO_URL, MAESTRO_CSV)
+    output_path = os.path.join(pipeline._DATA_DIR, f'{pipeline._merged_output_name("Big5")}_{SEASON}.csv')
+    with replay_fixtures(str(fixtures)):
+        first = pipeline._merge_and_export_incremental(_named_dfs(), SEASON)
+        assert first['mode'] == 'full'
+        merged = pd.read_csv(output_path)
+        assert merged.set_index('Player').loc['Son Heung-min', 'current_club_name'] == 'Tottenham'
+        identity_path = os.path.join(pipeline._snapshot_dir(), f'{pipeline._merged_output_name("Big5")}_{SEASON}.identity.json')
+        with open(identity_path, encoding='utf-8') as fh:
+            assert [row[:3] for row in json.load(fh)] == [['son-heung-min', 1992, 'heung-min-son']]
+        with open(output_path, 'rb') as fh:
+            written = fh.read()
+
+        # A fresh CI runner: no maestro store, no identity_map, no HTTP cache
+        shutil.rmtree(work_dirs / 'cache')
+        second = pipeline._merge_and_export_incremental(_named_dfs(), SEASON)
+
+    assert second['mode'] == 'incremental'
+    assert (second['added'], second['updated'], second['removed']) == ([], [], [])
+    with open(output_path, 'rb') as fh:
+        assert fh.read() == written
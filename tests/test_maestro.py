@@ -0,0 +1,37 @@
+import pandas as pd
+from conftest import write_fixture
+
+from stats_merger import pipeline
+from stats_merger.replay import replay_fixtures
+
+MAESTRO_CSV = (
+    'name,sub_position,current_club_name,market_value_in_eur,last_season,foot,height_in_cm,'
+    'contract_expiration_date,date_of_birth,country_of_citizenship\n'
+    'Bukayo Saka,Right Winger,Arsenal,120000000,2023,left,178,2027-06-30,2001-09-05,England\n'
+).encode('utf-8')
+UNREACHABLE_URL = 'http://127.0.0.1:9/players.csv' # Nothing listens on the discard port
+
+
+def _merged():
+    return pd.DataFrame({'Player': ['Bukayo Saka'], 'Squad': ['Arsenal'], 'Born': [2001], 'PlSqu': ['Bukayo SakaArsenal']})
+
+
+def test_join_uses_the_stored_maestro_when_players_csv_is_unreachable(work_dirs, monkeypatch):
+    fixtures = work_dirs / 'fixtures'
+    write_fixture(fixtures, pipeline._MAESTRO_URL, MAESTRO_CSV)
+    with replay_fixtures(str(fixtures)):
+        pipeline._refresh_maestro_store()
+
+    monkeypatch.setattr(pipeline, '_MAESTRO_URL', UNREACHABLE_URL)
+    monkeypatch.setattr(pipeline, '_HTTP_CACHE_TTL', 0) # The cached players.csv has expired
+    joined = pipeline._join_maestro(_merged())
+    assert joined.loc[0, 'current_club_name'] == 'Arsenal'
+    assert joined.loc[0, 'player_code'] == 'bukayo-saka'
+
+
+def test_join_is_skipped_without_any_stored_maestro(work_dirs, monkeypatch):
+    monkeypatch.setattr(pipeline, '_MAESTRO_URL', UNREACHABLE_URL)
+    joined = pipeline._join_maestro(_merged())
+    assert 'current_club_name' not in joined.columns
+    assert joined.loc[0, 'player_code'] == 'bukayo-saka'
+    assert not pipeline._maestro_store_exists()
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+from bench_pipeline import SEASON, write_synthetic_fixtures
+from conftest import fetched_statuses
+
+from stats_merger import pipeline, service
+from stats_merger.replay import replay_fixtures
+
+
+def _request(method, url):
+    """Returns the (status, JSON body) of one API call, errors included."""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=60) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def api(work_dirs, monkeypatch):
+    """A service on a free port over synthetic FBRef pages; upstream fetches wait until gate is set."""
+    monkeypatch.setattr(pipeline, '_HTTP_CACHE_ENABLED', False) # Sharing must come from the service, not the cache
+    gate = threading.Event()
+    fetch_stat_table = service.fetch_stat_table
+    def gated_fetch(*args, **kwargs):
+        assert gate.wait(60)
+        return fetch_stat_table(*args, **kwargs)
+    monkeypatch.setattr(service, 'fetch_stat_table', gated_fetch)
+
+    fixtures = str(work_dirs / 'fixtures')
+    write_synthetic_fixtures(fixtures, 200)
+    with replay_fixtures(fixtures):
+        server = service.start_service(port=0, export=False)
+        try:
+            yield f'http://127.0.0.1:{server.server_port}', server.service, gate
+        finally:
+            gate.set()
+            server.shutdown()
+            server.server_close()
+            server.service.close()
+
+
+def test_duplicate_job_submissions_are_deduplicated(api):
+    base, scraper, gate = api
+    status, first = _request('POST', f'{base}/jobs?season={SEASON[:4]}')
+    assert status == 202
+    status, second = _request('POST', f'{base}/jobs?season={SEASON}')
+    assert status == 202 and second['id'] == first['id']
+    assert len(scraper.list_jobs()) == 1
+
+    gate.set()
+    _wait_for(lambda: _request('GET', f'{base}/jobs/{first["id"]}')[1]['status'] == 'done')
+    status, third = _request('POST', f'{base}/jobs?season={SEASON}')
+    assert third['id'] != first['id'] # A finished job is not reused
+
+
+def test_concurrent_stat_fetches_share_one_upstream_request(api, monkeypatch):
+    base, scraper, gate = api
+    fetch_calls = []
+    fetch_stat = scraper.fetch_stat
+    def counting_fetch_stat(*args, **kwargs):
+        fetch_calls.append(args)
+        return fetch_stat(*args, **kwargs)
+    monkeypatch.setattr(scraper, 'fetch_stat', counting_fetch_stat)
+
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(_request('GET', f'{base}/seasons/{SEASON}/stats/shooting')))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: len(fetch_calls) == 4) # Every request is waiting on the same fetch
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert [status for status, _ in responses] == [200] * 4
+    assert all(body == responses[0][1] for _, body in responses)
+    assert responses[0][1]['rows'] == 200
+    assert fetched_statuses() == [200]
+
+
+def test_filtered_player_queries_return_the_matching_rows(api):
+    base, scraper, gate = api
+    gate.set()
+    _, job = _request('POST', f'{base}/jobs?season={SEASON}')
+    _wait_for(lambda: _request('GET', f'{base}/jobs/{job["id"]}')[1]['status'] == 'done')
+    table = scraper.season_table(SEASON)
+
+    status, body = _request('GET', f'{base}/seasons/{SEASON}/players?squad=arsenal,Chelsea&pos=FW&columns=Player,Squad,Pos')
+    assert status == 200
+    positions = table['Pos'].astype(str).str.split(',').apply(lambda listed: 'FW' in [pos.strip() for pos in listed])
+    expected = table[table['Squad'].astype(str).isin(['Arsenal', 'Chelsea']) & positions]
+    assert len(expected) > 0
+    assert body['rows'] == len(expected)
+    assert [row['Player'] for row in body['data']] == expected['Player'].tolist()
+    assert set(body['data'][0]) == {'Player', 'Squad', 'Pos'}
+
+    player = table['Player'].iloc[0]
+    _, body = _request('GET', f'{base}/seasons/{SEASON}/players?player={urllib.parse.quote(player)}&columns=Player')
+    assert player in [row['Player'] for row in body['data']]
+    comp = str(table['Comp'].iloc[0])
+    _, body = _request('GET', f'{base}/seasons/{SEASON}/players?comp={urllib.parse.quote(comp.upper())}&limit=3')
+    assert body['rows'] == 3 and {row['Comp'] for row in body['data']} == {comp}
+    assert _request('GET', f'{base}/seasons/{SEASON}/players?columns=Player,Nope')[0] == 400
+    assert _request('GET', f'{base}/seasons/{SEASON}/players?limit=many')[0] == 400
+
+
+def test_unknown_paths_are_404_and_bad_parameters_are_400(api):
+    base, _, _ = api
+    assert _request('GET', f'{base}/nope')[0] == 404
+    assert _request('GET', f'{base}/jobs/999')[0] == 404
+    assert _request('GET', f'{base}/seasons/{SEASON}/players')[0] == 404 # Not built yet
+    assert _request('POST', f'{base}/jobs?season=soon')[0] == 400
+    assert _request('POST', f'{base}/jobs?season=2023-2025')[0] == 400
+    assert _request('POST', f'{base}/jobs?season={SEASON}&competition=Nope')[0] == 400
+    status, body = _request('GET', f'{base}/seasons/{SEASON}/stats/nope')
+    assert status == 400 and 'nope' in body['error']
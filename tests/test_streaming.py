@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+from bench_pipeline import SEASON, write_synthetic_fixtures
+
+from stats_merger import pipeline
+from stats_merger.replay import replay_fixtures
+
+
+def _counting(monkeypatch, name):
+    """Wraps a pipeline function and returns the list its calls are recorded in."""
+    calls = []
+    original = getattr(pipeline, name)
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(pipeline, name, wrapper)
+    return calls
+
+
+def test_streaming_refreshes_and_blocks_the_maestro_once_per_season(work_dirs, monkeypatch):
+    fixtures = str(work_dirs / 'fixtures')
+    write_synthetic_fixtures(fixtures, 200)
+    start_year = int(SEASON[:4])
+    output_path = os.path.join(pipeline._DATA_DIR, f'{pipeline._merged_output_name("Big5")}_{SEASON}.csv')
+    with replay_fixtures(fixtures):
+        pipeline._merge_and_export_season(pipeline.scrape_all_stats_for_merge(start_year=start_year), SEASON)
+        in_memory = pd.read_csv(output_path)
+
+        refreshes = _counting(monkeypatch, '_refresh_maestro_store')
+        loads = _counting(monkeypatch, '_load_maestro_candidates')
+        pipeline._merge_and_export_streaming(start_year, partitions=4)
+        streamed = pd.read_csv(output_path)
+
+    assert (len(refreshes), len(loads)) == (1, 1)
+    assert 'current_club_name' in streamed.columns and streamed['current_club_name'].notna().any()
+    pd.testing.assert_frame_equal(streamed.sort_values('PlSqu').reset_index(drop=True),
+                                  in_memory.sort_values('PlSqu').reset_index(drop=True), check_like=True)